@@ -6,76 +6,119 @@ Supports three modes:
  - 'mass'       : update Mass times
  - 'events'     : extract parish events
  - 'intentions' : extract Mass intentions
+plus 'all', which scrapes, downloads and renders each bulletin once and runs
+all three analyses on it.
 When the --output argument is not provided, the default output filenames are:
  - mass mode       -> bulletins_analysis.md
  - events mode     -> events_analysis.md
  - intentions mode -> intentions_analysis.md
+In 'all' mode every report is written to its default filename.
 """
 
 import logging
 import os
 import sys
 import json
+import threading
 import argparse
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import quote
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Import utilities
-from utils import scraping, llm, events, intentions
+from utils import scraping, sessions, http_cache, bulletin_store, page_cache, page_selection, page_text, pipeline, llm, llm_engine, llm_cache, church_patches, prompts, events, intentions
+from utils import pdf_to_images
 from utils.logging_config import setup_logging
 
+RENDER_WORKERS = min(4, os.cpu_count() or 1)
 
-def analyze_bulletin_task(website, pdf_link, pdf_path, churches_for_bulletin, model=None, use_images=True):
+MODES = ['mass', 'events', 'intentions']
+DEFAULT_OUTPUTS = {
+    'mass': 'bulletins_analysis.md',
+    'events': 'events_analysis.md',
+    'intentions': 'intentions_analysis.md',
+}
+
+
+def analyze_bulletin_task(website, pdf_link, pdf_path, churches_for_bulletin, model=None, use_images=True, images=None,
+                          outcome=None):
     """
     Helper function to analyze a single bulletin for mass time differences.
-    Returns (website, pdf_link, markdown, church_names, churches) tuple.
+    Returns (website, pdf_link, differences, church_names, churches) tuple.
+    differences is [] when there are none and None when analysis failed;
+    outcome['complete'] is set to False when only part of the answer was usable.
     """
     logger = logging.getLogger(__name__)
     
     # Pass all churches that share this bulletin to the LLM at once
-    markdown = llm.analyze_bulletin(pdf_path, churches_for_bulletin, model=model, use_images=use_images)
+    differences = llm.analyze_bulletin(
+        pdf_path, churches_for_bulletin, model=model, use_images=use_images, images=images, outcome=outcome
+    )
     church_names = [c.get('name', 'Unknown') for c in churches_for_bulletin]
     
-    if markdown is None:
+    if differences is None:
         logger.warning(f"Failed to analyze PDF for churches: {', '.join(church_names)}")
-        return (website, pdf_link, None, church_names, churches_for_bulletin)
-    elif markdown:
-        return (website, pdf_link, markdown, church_names, churches_for_bulletin)
-    else:
-        return (website, pdf_link, None, church_names, churches_for_bulletin)
+    
+    return (website, pdf_link, differences, church_names, churches_for_bulletin)
 
 
-def extract_events_task(website, pdf_link, pdf_path, churches_for_bulletin, existing_events, model=None, use_images=True):
+def extract_events_task(website, pdf_link, pdf_path, churches_for_bulletin, existing_events, model=None, use_images=True, images=None,
+                        dedup_window_days=events.DEDUP_WINDOW_DAYS, dedup_max_events=events.MAX_DEDUP_EVENTS,
+                        outcome=None):
     """
     Helper function to extract events from a single bulletin.
     Returns (website, pdf_link, events_list, church_names, family_of_parishes) tuple.
+    events_list is None when extraction failed; outcome['complete'] is set to False when
+    only part of the answer was usable.
     """
     logger = logging.getLogger(__name__)
     
     church_names = [c.get('name', 'Unknown') for c in churches_for_bulletin]
     family_of_parishes = events.get_family_of_parishes(churches_for_bulletin)
     
-    # Prepare simplified church context for LLM
-    churches_context = events.prepare_churches_context(churches_for_bulletin)
-    
-    # Filter existing events to this family for deduplication context
-    family_events = events.filter_events_for_family(existing_events, family_of_parishes)
-    events_context = events.prepare_existing_events_context(family_events)
-    
     # Extract events from bulletin
     extracted = llm.extract_events_from_bulletin(
         pdf_path, 
-        churches_context, 
-        events_context, 
+        churches_for_bulletin, 
         model=model,
-        use_images=use_images
+        use_images=use_images,
+        images=images,
+        outcome=outcome
     )
     
     if extracted is None:
         logger.warning(f"Failed to extract events for churches: {', '.join(church_names)}")
-        return (website, pdf_link, [], church_names, family_of_parishes)
+        return (website, pdf_link, None, church_names, family_of_parishes)
+    
+    # Match against this family's existing events: clear duplicates and clearly
+    # new events locally, and only the unclear rest through the LLM
+    for event in extracted:
+        event['id'] = None
+    family_events = events.filter_events_for_family(existing_events, family_of_parishes)
+    duplicates, new, unclear = events.prematch_events(extracted, family_events, window_days=dedup_window_days)
+    matched = 0
+    if unclear:
+        possible = {c.get('id'): c for _, event_candidates in unclear for c in event_candidates}
+        candidates = events.select_dedup_events(
+            list(possible.values()),
+            [events.event_date(event) for event, _ in unclear],
+            window_days=dedup_window_days,
+            max_events=dedup_max_events
+        )
+        matches = llm.match_events(
+            [event for event, _ in unclear],
+            events.prepare_existing_events_context(candidates),
+            model=model,
+            context=', '.join(church_names)
+        )
+        for index, event_id in (matches or {}).items():
+            unclear[index][0]['id'] = event_id
+        matched = len(matches or {})
+    if extracted:
+        logger.info(
+            f"Matched events for {', '.join(church_names)}: {duplicates} duplicate, {new} new, "
+            f"{len(unclear)} unclear ({matched} matched by the LLM)"
+        )
     
     # Add metadata to each event
     for event in extracted:
@@ -84,29 +127,31 @@ def extract_events_task(website, pdf_link, pdf_path, churches_for_bulletin, exis
     return (website, pdf_link, extracted, church_names, family_of_parishes)
 
 
-def extract_intentions_task(website, pdf_link, pdf_path, churches_for_bulletin, model=None, use_images=True):
+def extract_intentions_task(website, pdf_link, pdf_path, churches_for_bulletin, model=None, use_images=True, images=None,
+                            outcome=None):
     """
     Helper function to extract Mass intentions from a single bulletin.
     Returns (website, pdf_link, intentions_list, church_names) tuple.
+    intentions_list is None when extraction failed; outcome['complete'] is set to False when
+    only part of the answer was usable.
     """
     logger = logging.getLogger(__name__)
     
     church_names = [c.get('name', 'Unknown') for c in churches_for_bulletin]
     
-    # Prepare churches context for LLM (includes mass schedules for matching)
-    churches_context = intentions.prepare_churches_context(churches_for_bulletin)
-    
     # Extract intentions from bulletin
     extracted = llm.extract_intentions_from_bulletin(
         pdf_path, 
-        churches_context, 
+        churches_for_bulletin, 
         model=model,
-        use_images=use_images
+        use_images=use_images,
+        images=images,
+        outcome=outcome
     )
     
     if extracted is None:
         logger.warning(f"Failed to extract intentions for churches: {', '.join(church_names)}")
-        return (website, pdf_link, [], church_names)
+        return (website, pdf_link, None, church_names)
     
     # Add metadata to each intention entry
     for intention in extracted:
@@ -115,6 +160,263 @@ def extract_intentions_task(website, pdf_link, pdf_path, churches_for_bulletin,
     return (website, pdf_link, extracted, church_names)
 
 
+def parse_image_encodings(specs):
+    """
+    Resolve --image-encoding values into an ImageEncoding per mode.
+    Each spec is "<encoding>" (all modes) or "<mode>=<encoding>"; later specs win.
+    
+    Raises:
+        ValueError: If a spec names an unknown mode or encoding
+    """
+    encodings = {mode: pdf_to_images.DEFAULT_ENCODING for mode in MODES}
+    for spec in specs or []:
+        mode, sep, encoding_spec = spec.partition('=')
+        if sep and mode.strip() in MODES:
+            encodings[mode.strip()] = pdf_to_images.parse_image_encoding(encoding_spec)
+        elif sep and '=' not in mode and ',' not in mode:
+            raise ValueError(f"unknown mode {mode.strip()!r} in {spec!r}")
+        else:
+            encoding = pdf_to_images.parse_image_encoding(spec)
+            encodings = {m: encoding for m in MODES}
+    return encodings
+
+
+def mode_context(mode, churches_for_bulletin, use_images, image_encoding=None, text_first=False):
+    """
+    Prompt inputs, besides the bulletin itself, that a mode's result depends on.
+    Used to decide whether a stored result can be reused.
+    """
+    if mode == 'events':
+        churches_context = events.prepare_churches_context(churches_for_bulletin)
+    elif mode == 'intentions':
+        churches_context = intentions.prepare_churches_context(churches_for_bulletin)
+    else:
+        churches_context = churches_for_bulletin
+    context = {'churches': churches_context, 'use_images': use_images}
+    if use_images and image_encoding:
+        context['image_encoding'] = image_encoding.key
+    if text_first:
+        context['text_first'] = True
+    return context
+
+
+def stored_result_key(args, mode, sha, context):
+    """
+    Build the BulletinStore lookup key for a bulletin in a given mode.
+    Returns None if the bulletin is not in the store.
+    """
+    if not sha:
+        return None
+    return {
+        'sha': sha,
+        'mode': mode,
+        'model': llm.primary_model(args.model),
+        'prompt_version': llm.PROMPT_VERSIONS[mode],
+        'context_hash': bulletin_store.fingerprint(context),
+    }
+
+
+def get_stored_result(args, store, key):
+    """Return (True, result) if the store already holds a result for key, else (False, None)."""
+    if store is None or key is None or args.reprocess:
+        return False, None
+    return store.get_result(**key)
+
+
+def log_trim_summary(logger, jobs):
+    """Log the total pixels and bytes saved by page trimming across all bulletins."""
+    all_stats = [stats for job in jobs for stats in job['render_stats']]
+    if not all_stats:
+        return
+    pixels = sum(stats['pixels'] for stats in all_stats)
+    pixels_saved = sum(stats['pixels_saved'] for stats in all_stats)
+    bytes_saved = sum(stats['bytes_saved'] for stats in all_stats)
+    dropped = sum(stats['dropped'] for stats in all_stats)
+    if pixels + pixels_saved:
+        logger.info(
+            f"Page trimming saved {pixels_saved / (pixels + pixels_saved):.0%} of pixels "
+            f"(~{bytes_saved / (1024 * 1024):.1f} MB) and dropped {dropped} blank page(s)"
+        )
+
+
+def build_pipeline_stages(args, churches, modes, store, bulletins_dir, use_images, existing_events=None,
+                          image_encodings=None):
+    """
+    Build the streaming stages: discover -> download -> render -> analyze.
+    Each bulletin moves on as soon as the previous stage finishes with it,
+    so LLM analysis of early bulletins overlaps scraping of later ones.
+    Every stage takes and returns a job dict (see main); returning None drops it.
+    """
+    logger = logging.getLogger(__name__)
+    image_encodings = image_encodings or parse_image_encodings(None)
+    scrape_throttle = scraping.HostThrottle(
+        min_interval=args.host_interval,
+        max_in_flight=args.host_max_in_flight
+    )
+    download_throttle = scraping.HostThrottle(
+        min_interval=scraping.DOWNLOAD_HOST_MIN_INTERVAL,
+        max_in_flight=args.download_per_host
+    )
+    max_bytes = int(args.max_pdf_mb * 1024 * 1024)
+    os.makedirs(bulletins_dir, exist_ok=True)
+    downloaded = {'bytes': 0, 'lock': threading.Lock()}
+    
+    def discover(job):
+        pdf_link = scraping.scrape_bulletin_with_retry(job['church_name'], job['website'], scrape_throttle)
+        if not pdf_link:
+            logger.warning(f"✗ {job['church_name']}: No PDF found after retries")
+            return None
+        logger.info(f"✓ {job['church_name']}: {pdf_link[:60]}...")
+        job['pdf_link'] = pdf_link
+        return job
+    
+    def download(job):
+        pdf_path = os.path.join(bulletins_dir, f"bulletin_{job['index']}.pdf")
+        with download_throttle.slot(job['pdf_link']):
+            if not scraping.download_pdf(job['pdf_link'], pdf_path, max_bytes=max_bytes):
+                return None
+        with downloaded['lock']:
+            downloaded['bytes'] += os.path.getsize(pdf_path)
+        # Keep a single copy: the download moves into the store and later stages
+        # read it from there (the positional file stays only if that fails)
+        job['pdf_path'] = pdf_path
+        try:
+            job['sha'] = store.ingest(pdf_path, job['website'], job['pdf_link'], move=True)
+            job['pdf_path'] = store.pdf_path(job['sha'])
+        except OSError as e:
+            logger.warning(f"Failed to add {pdf_path} to bulletin store: {str(e)[:50]}")
+        return job
+    
+    def render(job):
+        # Find ALL churches that use this bulletin website
+        job['churches'] = [
+            c for c in churches
+            if c.get('bulletin_website') == job['website']
+        ]
+        if not job['churches']:
+            logger.warning(f"No church found for website {job['website']}, skipping")
+            return None
+        
+        # Reuse stored results for unchanged bulletins
+        church_names = ', '.join(c.get('name', 'Unknown') for c in job['churches'])
+        for mode in modes:
+            context = mode_context(mode, job['churches'], use_images, image_encodings[mode], args.text_first)
+            key = stored_result_key(args, mode, job.get('sha'), context)
+            job['keys'][mode] = key
+            found, result = get_stored_result(args, store, key)
+            if found:
+                logger.info(f"↺ Unchanged bulletin, reusing stored {mode} result for: {church_names}")
+                job['results'][mode] = result
+                job['stored'].add(mode)
+        
+        # Pick each pending mode's pages from the text layer, then render the
+        # union once per encoding
+        pending = [mode for mode in modes if mode not in job['stored']]
+        if pending and use_images:
+            texts = page_selection.page_texts(job['pdf_path'])
+            selected = {
+                mode: page_selection.select_pages(job['pdf_path'], mode, llm.MAX_PAGES[mode], texts=texts)
+                for mode in pending
+            }
+            # Text-first: pages with a usable text layer are sent as text and
+            # only the rest are rendered
+            page_texts = {}
+            if args.text_first:
+                candidates = sorted(set().union(*selected.values()))
+                page_texts = {
+                    page_num: text
+                    for page_num, text in page_text.extract_page_texts(job['pdf_path'], candidates).items()
+                    if text
+                }
+                logger.debug(
+                    f"Bulletin {job['index']}: {len(page_texts)}/{len(candidates)} page(s) sent as text"
+                )
+            job['images'] = {}
+            for encoding in dict.fromkeys(image_encodings[mode] for mode in pending):
+                encoding_modes = [mode for mode in pending if image_encodings[mode] == encoding]
+                page_numbers = sorted(set().union(*(selected[mode] for mode in encoding_modes)) - set(page_texts))
+                stats = {}
+                pages = pdf_to_images.render_pdf_pages(
+                    job['pdf_path'],
+                    page_numbers=page_numbers,
+                    pdf_hash=job.get('sha'),
+                    encoding=encoding,
+                    stats=stats
+                ) if page_numbers else []
+                logger.debug(
+                    f"Rendered {len(pages)} page(s) as {encoding.key} "
+                    f"({sum(len(page) for page in pages) / 1024:.0f} KB) for bulletin {job['index']}"
+                )
+                if stats.get('pixels_saved') or stats.get('dropped'):
+                    total_pixels = stats['pixels'] + stats['pixels_saved']
+                    logger.info(
+                        f"✂ {job['church_name']}: trimmed {stats['pixels_saved'] / total_pixels:.0%} of pixels, "
+                        f"~{stats['bytes_saved'] / 1024:.0f} KB saved, {stats['dropped']} blank page(s) dropped"
+                    )
+                if stats:
+                    job['render_stats'].append(stats)
+                pages = sorted(
+                    pages + [page_text.PageText(text, page_num + 1) for page_num, text in page_texts.items()],
+                    key=lambda page: page.page_number
+                )
+                for mode in encoding_modes:
+                    wanted = {page_num + 1 for page_num in selected[mode]}
+                    # An empty list (every page blank or failed) is kept as is: None would
+                    # make the LLM helpers re-render with the default encoding
+                    job['images'][mode] = [page for page in pages if page.page_number in wanted]
+        return job
+    
+    def analyze(job):
+        for mode in modes:
+            if mode in job['stored']:
+                continue
+            images = job['images'].get(mode) if job['images'] else None
+            outcome = {}
+            if mode == 'mass':
+                result = analyze_bulletin_task(
+                    job['website'], job['pdf_link'], job['pdf_path'], job['churches'],
+                    model=args.model, use_images=use_images, images=images, outcome=outcome
+                )
+            elif mode == 'events':
+                result = extract_events_task(
+                    job['website'], job['pdf_link'], job['pdf_path'], job['churches'],
+                    existing_events or [], model=args.model, use_images=use_images, images=images,
+                    dedup_window_days=args.dedup_window_days, dedup_max_events=args.dedup_max_events,
+                    outcome=outcome
+                )
+            else:
+                result = extract_intentions_task(
+                    job['website'], job['pdf_link'], job['pdf_path'], job['churches'],
+                    model=args.model, use_images=use_images, images=images, outcome=outcome
+                )
+            job['results'][mode] = result[2]
+            if outcome.get('complete') is False:
+                # Use what could be read, but analyze the bulletin again next run
+                job['partial'].add(mode)
+            
+            # Events are recorded after merging, once they have IDs
+            key = job['keys'].get(mode)
+            if mode != 'events' and result[2] is not None and mode not in job['partial'] and key:
+                store.record_result(result=result[2], **key)
+        
+        # Release page images as soon as the bulletin is done
+        job['images'] = None
+        return job
+    
+    def download_summary(stage):
+        elapsed = stage.active_time
+        megabytes = downloaded['bytes'] / (1024 * 1024)
+        rate = megabytes / elapsed if elapsed > 0 else 0
+        return f"{megabytes:.1f} MB in {elapsed:.1f}s ({rate:.1f} MB/s)"
+    
+    return [
+        pipeline.Stage('discover', discover, workers=args.scrape_workers),
+        pipeline.Stage('download', download, workers=args.download_workers, summary=download_summary),
+        pipeline.Stage('render', render, workers=args.render_workers),
+        pipeline.Stage('analyze', analyze, workers=args.workers),
+    ]
+
+
 def main():
     """Main application flow"""
     parser = argparse.ArgumentParser(
@@ -123,8 +425,8 @@ def main():
     parser.add_argument(
         '--mode',
         default='mass',
-        choices=['mass', 'events', 'intentions'],
-        help='Scraper mode: mass (update times), events (extract events), intentions (extract Mass intentions)'
+        choices=MODES + ['all'],
+        help='Scraper mode: mass (update times), events (extract events), intentions (extract Mass intentions), all (every mode in one pass)'
     )
     parser.add_argument(
         '--log-level',
@@ -135,7 +437,7 @@ def main():
     parser.add_argument(
         '--output',
         default=None,
-        help='Output markdown file (default: bulletins_analysis.md for mass, events_analysis.md for events)'
+        help='Output markdown file (default: bulletins_analysis.md for mass, events_analysis.md for events); ignored in all mode'
     )
     parser.add_argument(
         '--churches-path',
@@ -158,35 +460,178 @@ def main():
         default=10,
         help='Number of parallel workers for LLM analysis (default: 10)'
     )
+    parser.add_argument(
+        '--rpm',
+        type=int,
+        default=llm_engine.DEFAULT_RPM,
+        help=f'LLM requests per minute budget; 0 disables the limit (default: {llm_engine.DEFAULT_RPM})'
+    )
+    parser.add_argument(
+        '--tpm',
+        type=int,
+        default=llm_engine.DEFAULT_TPM,
+        help=f'Estimated LLM tokens per minute budget; 0 disables the limit (default: {llm_engine.DEFAULT_TPM})'
+    )
+    parser.add_argument(
+        '--scrape-workers',
+        type=int,
+        default=scraping.DISCOVERY_WORKERS,
+        help=f'Number of bulletin websites to scrape concurrently (default: {scraping.DISCOVERY_WORKERS})'
+    )
+    parser.add_argument(
+        '--host-interval',
+        type=float,
+        default=scraping.HOST_MIN_INTERVAL,
+        help=f'Minimum seconds between requests to the same host (default: {scraping.HOST_MIN_INTERVAL})'
+    )
+    parser.add_argument(
+        '--host-max-in-flight',
+        type=int,
+        default=scraping.HOST_MAX_IN_FLIGHT,
+        help=f'Maximum concurrent requests to the same host (default: {scraping.HOST_MAX_IN_FLIGHT})'
+    )
     parser.add_argument(
         '--model',
         default=None,
         help='LLM model to use (overrides default in llm.py)'
     )
+    parser.add_argument(
+        '--model-chain',
+        default=None,
+        help='Comma-separated models to fail over through on errors or unusable output '
+             f'(default: {",".join(llm.MODEL_CHAIN)}); --model, if given, is tried first'
+    )
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        help='Also send a request to the next model in the chain once it runs past the observed p90 latency'
+    )
+    parser.add_argument(
+        '--no-stream',
+        action='store_true',
+        help='Wait for whole LLM responses instead of streaming them'
+    )
+    parser.add_argument(
+        '--idle-timeout',
+        type=int,
+        default=llm.STREAM_IDLE_TIMEOUT,
+        help=f'Seconds without streamed data before an LLM request is retried (default: {llm.STREAM_IDLE_TIMEOUT})'
+    )
     parser.add_argument(
         '--modify-json',
         action='store_true',
         help='Apply LLM suggestions to update churches.json or events.json'
     )
+    parser.add_argument(
+        '--dedup-window-days',
+        type=int,
+        default=events.DEDUP_WINDOW_DAYS,
+        help='Events mode: existing events within this many days of an extracted event, with a title word in common, '
+             f'are possible matches (e.g. rescheduled events) (default: {events.DEDUP_WINDOW_DAYS})'
+    )
+    parser.add_argument(
+        '--dedup-max-events',
+        type=int,
+        default=events.MAX_DEDUP_EVENTS,
+        help=f'Events mode: maximum existing events sent per bulletin when the LLM settles unclear matches, closest dates first (default: {events.MAX_DEDUP_EVENTS})'
+    )
+    parser.add_argument(
+        '--download-workers',
+        type=int,
+        default=scraping.DOWNLOAD_WORKERS,
+        help=f'Number of bulletin PDFs to download concurrently (default: {scraping.DOWNLOAD_WORKERS})'
+    )
+    parser.add_argument(
+        '--download-per-host',
+        type=int,
+        default=scraping.DOWNLOAD_HOST_MAX_IN_FLIGHT,
+        help=f'Maximum concurrent downloads from the same host (default: {scraping.DOWNLOAD_HOST_MAX_IN_FLIGHT})'
+    )
+    parser.add_argument(
+        '--render-workers',
+        type=int,
+        default=RENDER_WORKERS,
+        help=f'Number of bulletins rendered to page images concurrently (default: {RENDER_WORKERS})'
+    )
+    parser.add_argument(
+        '--render-processes',
+        type=int,
+        default=pdf_to_images.RENDER_PROCESSES,
+        help=f'Processes used to rasterise PDF pages; 0 renders in-thread (default: {pdf_to_images.RENDER_PROCESSES})'
+    )
+    parser.add_argument(
+        '--page-cache-mb',
+        type=int,
+        default=page_cache.MAX_CACHE_BYTES // (1024 * 1024),
+        help=f'Size limit of the rendered-page cache in MB; 0 disables it (default: {page_cache.MAX_CACHE_BYTES // (1024 * 1024)})'
+    )
+    parser.add_argument(
+        '--max-pdf-mb',
+        type=float,
+        default=scraping.MAX_PDF_BYTES / (1024 * 1024),
+        help=f'Skip bulletins larger than this many MB (default: {scraping.MAX_PDF_BYTES // (1024 * 1024)})'
+    )
+    parser.add_argument(
+        '--no-http-cache',
+        action='store_true',
+        help='Always re-fetch bulletin pages and PDFs instead of sending conditional requests'
+    )
+    parser.add_argument(
+        '--reprocess',
+        action='store_true',
+        help='Re-analyze bulletins even if an identical PDF was already processed with the same model and prompt (implies --no-cache)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not reuse cached LLM responses (fresh responses are still cached)'
+    )
     parser.add_argument(
         '--no-images',
         action='store_true',
         help='Disable image-based analysis and use PDF mode instead (less accurate but faster)'
     )
+    parser.add_argument(
+        '--text-first',
+        action='store_true',
+        help='Send the text layer of born-digital bulletins as text, rendering only pages whose text is missing or garbled'
+    )
+    parser.add_argument(
+        '--image-encoding',
+        action='append',
+        metavar='[MODE=]SPEC',
+        help='Page image encoding, e.g. "jpeg,q=75,gray,max=1568" or "events=webp,q=70"; '
+             'without MODE= it applies to all modes. Repeatable (default: png,max=2048)'
+    )
     
     args = parser.parse_args()
+    if args.text_first and args.no_images:
+        parser.error("--text-first cannot be combined with --no-images")
+    try:
+        image_encodings = parse_image_encodings(args.image_encoding)
+    except ValueError as e:
+        parser.error(f"--image-encoding: {e}")
     
     # Setup logging
     log_level = getattr(logging, args.log_level)
     logger = setup_logging(log_level)
     
     use_images = not args.no_images
-    mode_str = "image" if use_images else "PDF"
+    mode_str = "text-first" if args.text_first else "image" if use_images else "PDF"
     logger.info(f"Starting bulletin analysis in '{args.mode}' mode using {mode_str} analysis (log level: {args.log_level})")
+    if use_images and args.image_encoding:
+        for mode in (MODES if args.mode == 'all' else [args.mode]):
+            logger.info(f"Page images for {mode}: {image_encodings[mode].key}")
     
     # Set model if provided
     if args.model:
         logger.info(f"Using custom model: {args.model}")
+    if args.model_chain:
+        llm.configure_models(chain=[m.strip() for m in args.model_chain.split(',') if m.strip()])
+    llm.configure_models(hedge=args.hedge)
+    hedge_str = " (hedged after p90 latency)" if args.hedge else ""
+    logger.info(f"Model chain: {' -> '.join(llm.model_chain(args.model))}{hedge_str}")
+    llm.configure_streaming(enabled=not args.no_stream, idle_timeout=args.idle_timeout)
     
     # Resolve paths
     script_dir = Path(__file__).parent
@@ -195,16 +640,14 @@ def main():
     intentions_path = script_dir / args.intentions_path
     bulletins_dir = script_dir / 'bulletins'
     
-    # Set default output path based on mode
+    # Set output paths based on mode
+    modes = MODES if args.mode == 'all' else [args.mode]
+    output_paths = {mode: script_dir / DEFAULT_OUTPUTS[mode] for mode in modes}
     if args.output:
-        output_path = script_dir / args.output
-    else:
-        default_outputs = {
-            'mass': 'bulletins_analysis.md',
-            'events': 'events_analysis.md',
-            'intentions': 'intentions_analysis.md',
-        }
-        output_path = script_dir / default_outputs[args.mode]
+        if args.mode == 'all':
+            logger.warning("--output is ignored in 'all' mode; writing each report to its default filename")
+        else:
+            output_paths[args.mode] = script_dir / args.output
     
     # Verify churches.json exists
     if not churches_path.exists():
@@ -213,6 +656,14 @@ def main():
     
     logger.info(f"Using churches.json from {churches_path}")
     
+    if args.no_cache or args.reprocess:
+        llm_cache.set_use_cached(False)
+        logger.info("LLM response cache disabled; every bulletin is sent to the model")
+    
+    if args.no_http_cache:
+        http_cache.set_enabled(False)
+        logger.info("HTTP cache disabled; all pages and PDFs will be re-fetched")
+    
     # Step 1: Load churches data
     try:
         churches = scraping.load_churches_json(str(churches_path))
@@ -221,83 +672,88 @@ def main():
         logger.error(f"Failed to load churches: {e}")
         return 1
     
-    # Step 2: Scrape bulletin links with caching
-    try:
-        website_cache = scraping.get_bulletin_links(churches)
-    except Exception as e:
-        logger.error(f"Failed to scrape bulletin links: {e}")
-        return 1
+    # Step 2: Stream every bulletin through scrape -> download -> render -> analyze
+    existing_events = events.load_events_json(str(events_path)) if 'events' in modes else []
+    store = bulletin_store.BulletinStore()
+    stages = build_pipeline_stages(
+        args, churches, modes, store, str(bulletins_dir), use_images, existing_events, image_encodings
+    )
+    
+    websites = scraping.get_bulletin_websites(churches)
+    sources = [
+        {
+            'index': idx,
+            'website': website,
+            'church_name': church_name,
+            'images': None,
+            'render_stats': [],
+            'keys': {},
+            'results': {},
+            'stored': set(),
+            'partial': set(),
+        }
+        for idx, (website, church_name) in enumerate(websites.items(), 1)
+    ]
+    logger.info(f"Processing {len(sources)} bulletin website(s) (using {args.workers} LLM workers)...")
     
-    # Step 3: Download bulletins
+    pdf_to_images.configure_render_pool(args.render_processes)
+    # One in-flight request (and keep-alive connection) per LLM worker
+    llm.configure_api_pool(args.workers, rpm=args.rpm, tpm=args.tpm)
+    page_cache.set_max_bytes(args.page_cache_mb * 1024 * 1024)
     try:
-        downloaded = scraping.download_all_pdfs(website_cache, str(bulletins_dir))
-        logger.info(f"Downloaded {len(downloaded)} bulletins")
+        jobs = list(pipeline.run_pipeline(sources, stages))
     except Exception as e:
-        logger.error(f"Failed to download bulletins: {e}")
+        logger.error(f"Bulletin pipeline failed: {e}")
         return 1
+    finally:
+        # Keep Cloudflare clearance cookies for the next run
+        sessions.save_cookies()
+        http_cache.get_cache().prune()
+        llm_cache.get_cache().prune()
+        pdf_to_images.shutdown_render_pool()
     
-    if not downloaded:
+    if not jobs:
         logger.warning("No bulletins downloaded. Exiting.")
         return 0
     
-    # Branch based on mode
-    if args.mode == 'events':
-        return run_events_mode(args, logger, churches, downloaded, events_path, output_path, use_images)
-    elif args.mode == 'intentions':
-        return run_intentions_mode(args, logger, churches, downloaded, intentions_path, output_path, use_images)
-    else:
-        return run_mass_mode(args, logger, churches, downloaded, churches_path, output_path, use_images)
+    # Keep churches.json order regardless of completion order
+    jobs.sort(key=lambda job: job['index'])
+    log_trim_summary(logger, jobs)
+    
+    # Write reports (and optionally JSON files) for each mode
+    exit_code = 0
+    if 'mass' in modes:
+        exit_code = max(exit_code, run_mass_mode(args, logger, churches, jobs, churches_path, output_paths['mass']))
+    if 'events' in modes:
+        exit_code = max(exit_code, run_events_mode(args, logger, churches, jobs, existing_events, events_path, output_paths['events'], store))
+    if 'intentions' in modes:
+        exit_code = max(exit_code, run_intentions_mode(args, logger, churches, jobs, intentions_path, output_paths['intentions']))
+    
+    prompts.log_stats()
+    llm_engine.get_engine().log_stats()
+    llm.close_api_session()
+    return exit_code
 
 
-def run_mass_mode(args, logger, churches, downloaded, churches_path, output_path, use_images=True):
-    """Run the mass times analysis mode (original behavior)."""
+def run_mass_mode(args, logger, churches, jobs, churches_path, output_path):
+    """Run the mass times analysis mode (original behavior) on processed bulletin jobs."""
     
-    # Analyze each bulletin with LLM in parallel
-    logger.info(f"Analyzing {len(downloaded)} bulletin(s) with LLM (using {args.workers} workers)...")
-    markdown_results_unordered = {}  # Temporary dict to collect results from parallel execution
+    markdown_results_unordered = {}  # Temporary dict to collect results by website
     
-    # Prepare analysis tasks
-    tasks = []
-    for website, pdf_link, pdf_path in downloaded:
-        # Find ALL churches that use this bulletin website
-        churches_for_bulletin = [
-            c for c in churches 
-            if c.get('bulletin_website') == website
-        ]
-        
-        if not churches_for_bulletin:
-            logger.warning(f"No church found for website {website}, skipping")
-            continue
-        
-        tasks.append((website, pdf_link, pdf_path, churches_for_bulletin))
-    
-    # Execute analysis tasks in parallel
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        # Submit all tasks
-        futures = {
-            executor.submit(
-                analyze_bulletin_task, 
-                website, pdf_link, pdf_path, churches_for_bulletin, 
-                model=args.model, use_images=use_images
-            ): (website, pdf_link, churches_for_bulletin)
-            for website, pdf_link, pdf_path, churches_for_bulletin in tasks
-        }
-        
-        # Process results as they complete
-        for future in as_completed(futures):
-            try:
-                website, pdf_link, markdown, church_names, churches_for_bulletin = future.result()
-                
-                if markdown:  # Only add if there are differences
-                    markdown_results_unordered[website] = {
-                        'markdown': markdown,
-                        'church_names': church_names,
-                        'churches': churches_for_bulletin,
-                        'pdf_link': pdf_link
-                    }
-            except Exception as e:
-                logger.error(f"Task failed: {e}")
-                continue
+    stored_count = sum(1 for job in jobs if 'mass' in job['stored'])
+    if stored_count:
+        logger.info(f"Skipped LLM analysis for {stored_count} unchanged bulletin(s)")
+    
+    for job in jobs:
+        differences = job['results'].get('mass')
+        if differences:  # Only add if there are differences
+            markdown_results_unordered[job['website']] = {
+                'differences': differences,
+                'markdown': church_patches.render_markdown(differences, job['churches']),
+                'church_names': [c.get('name', 'Unknown') for c in job['churches']],
+                'churches': job['churches'],
+                'pdf_link': job['pdf_link']
+            }
     
     # Reorder results to match the order of churches in churches.json using a list of tuples
     markdown_results = []
@@ -317,19 +773,17 @@ def run_mass_mode(args, logger, churches, downloaded, churches_path, output_path
         return 1
     
     # Optionally apply modifications to churches.json
-    if args.modify_json:
-        logger.info("--modify-json flag set. Applying LLM suggestions to churches.json...")
+    if args.modify_json and not markdown_results:
+        logger.info("--modify-json flag set, but nothing changed; churches.json left as is")
+    elif args.modify_json:
+        logger.info("--modify-json flag set. Applying differences to churches.json...")
         try:
-            # Read the generated markdown report
-            with open(output_path, 'r', encoding='utf-8') as f:
-                markdown_content = f.read()
-            
-            # Apply modifications
-            updated_churches = llm.update_churches_from_markdown(
+            # Apply modifications as per-church patches
+            updated_churches = llm.update_churches_from_differences(
                 churches,
-                markdown_content,
                 markdown_results,
-                model=args.model
+                model=args.model,
+                max_workers=args.workers
             )
             
             # Write updated churches.json
@@ -350,65 +804,49 @@ def run_mass_mode(args, logger, churches, downloaded, churches_path, output_path
     return 0
 
 
-def run_events_mode(args, logger, churches, downloaded, events_path, output_path, use_images=True):
-    """Run the events extraction mode."""
+def run_events_mode(args, logger, churches, jobs, existing_events, events_path, output_path, store=None):
+    """Run the events extraction mode on processed bulletin jobs."""
     
-    # Load existing events for deduplication
-    existing_events = events.load_events_json(str(events_path))
-    
-    # Extract events from each bulletin in parallel
-    logger.info(f"Extracting events from {len(downloaded)} bulletin(s) with LLM (using {args.workers} workers)...")
     all_extracted_events = []
     events_results = []  # For report generation
     
-    # Prepare extraction tasks
-    tasks = []
-    for website, pdf_link, pdf_path in downloaded:
-        # Find ALL churches that use this bulletin website
-        churches_for_bulletin = [
-            c for c in churches 
-            if c.get('bulletin_website') == website
-        ]
-        
-        if not churches_for_bulletin:
-            logger.warning(f"No church found for website {website}, skipping")
-            continue
-        
-        tasks.append((website, pdf_link, pdf_path, churches_for_bulletin))
-    
-    # Execute extraction tasks in parallel
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        # Submit all tasks
-        futures = {
-            executor.submit(
-                extract_events_task, 
-                website, pdf_link, pdf_path, churches_for_bulletin, 
-                existing_events, model=args.model, use_images=use_images
-            ): (website, pdf_link, churches_for_bulletin)
-            for website, pdf_link, pdf_path, churches_for_bulletin in tasks
-        }
-        
-        # Process results as they complete
-        for future in as_completed(futures):
-            try:
-                website, pdf_link, extracted_events, church_names, family_of_parishes = future.result()
-                
-                if extracted_events:
-                    all_extracted_events.extend(extracted_events)
-                    events_results.append({
-                        'website': website,
-                        'pdf_link': pdf_link,
-                        'events': extracted_events,
-                        'church_names': church_names,
-                        'family_of_parishes': family_of_parishes
-                    })
-            except Exception as e:
-                logger.error(f"Events extraction task failed: {e}")
-                continue
+    stored_count = sum(1 for job in jobs if 'events' in job['stored'])
+    if stored_count:
+        logger.info(f"Skipped LLM extraction for {stored_count} unchanged bulletin(s)")
+    
+    for job in jobs:
+        extracted_events = job['results'].get('events')
+        if extracted_events and 'events' in job['stored']:
+            # Stored events carry the IDs of an earlier run; match them against
+            # events.json as it is now and point them at the current bulletin link
+            family_events = events.filter_events_for_family(
+                existing_events, events.get_family_of_parishes(job['churches'])
+            )
+            events.prematch_events(extracted_events, family_events, window_days=args.dedup_window_days)
+            for event in extracted_events:
+                event['source_bulletin_link'] = job['pdf_link']
+        if extracted_events:
+            all_extracted_events.extend(extracted_events)
+            events_results.append({
+                'website': job['website'],
+                'pdf_link': job['pdf_link'],
+                'events': extracted_events,
+                'church_names': [c.get('name', 'Unknown') for c in job['churches']],
+                'family_of_parishes': events.get_family_of_parishes(job['churches'])
+            })
     
     # Merge extracted events with existing events
     merged_events = events.merge_events(existing_events, all_extracted_events)
     
+    # Remember results (with their assigned IDs) so unchanged bulletins are skipped next run
+    if store is not None:
+        for job in jobs:
+            key = job['keys'].get('events')
+            extracted_events = job['results'].get('events')
+            if (key and extracted_events is not None
+                    and 'events' not in job['stored'] and 'events' not in job['partial']):
+                store.record_result(result=extracted_events, **key)
+    
     # Write events analysis report
     try:
         write_events_report(output_path, events_results)
@@ -434,60 +872,29 @@ def run_events_mode(args, logger, churches, downloaded, events_path, output_path
     return 0
 
 
-def run_intentions_mode(args, logger, churches, downloaded, intentions_path, output_path, use_images=True):
-    """Run the Mass intentions extraction mode."""
+def run_intentions_mode(args, logger, churches, jobs, intentions_path, output_path):
+    """Run the Mass intentions extraction mode on processed bulletin jobs."""
     
     # Load existing intentions for merging
     existing_intentions = intentions.load_intentions_json(str(intentions_path))
     
-    # Extract intentions from each bulletin in parallel
-    logger.info(f"Extracting Mass intentions from {len(downloaded)} bulletin(s) with LLM (using {args.workers} workers)...")
     all_extracted_intentions = []
     intentions_results = []  # For report generation
     
-    # Prepare extraction tasks
-    tasks = []
-    # Diagnostic: log downloaded websites and how many churches match each
-    logger.debug(f"Downloaded bulletin websites: {[w for w, _, _ in downloaded][:10]}")
-    for website, pdf_link, pdf_path in downloaded:
-        churches_for_bulletin = [
-            c for c in churches 
-            if c.get('bulletin_website') == website
-        ]
-        logger.debug(f"Website {website} -> matched {len(churches_for_bulletin)} church(es)")
-        
-        if not churches_for_bulletin:
-            logger.warning(f"No church found for website {website}, skipping")
-            continue
-        
-        tasks.append((website, pdf_link, pdf_path, churches_for_bulletin))
-    
-    # Execute extraction tasks in parallel
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        futures = {
-            executor.submit(
-                extract_intentions_task, 
-                website, pdf_link, pdf_path, churches_for_bulletin, 
-                model=args.model, use_images=use_images
-            ): (website, pdf_link, churches_for_bulletin)
-            for website, pdf_link, pdf_path, churches_for_bulletin in tasks
-        }
-        
-        for future in as_completed(futures):
-            try:
-                website, pdf_link, extracted_intentions, church_names = future.result()
-                
-                if extracted_intentions:
-                    all_extracted_intentions.extend(extracted_intentions)
-                    intentions_results.append({
-                        'website': website,
-                        'pdf_link': pdf_link,
-                        'intentions': extracted_intentions,
-                        'church_names': church_names,
-                    })
-            except Exception as e:
-                logger.error(f"Intentions extraction task failed: {e}")
-                continue
+    stored_count = sum(1 for job in jobs if 'intentions' in job['stored'])
+    if stored_count:
+        logger.info(f"Skipped LLM extraction for {stored_count} unchanged bulletin(s)")
+    
+    for job in jobs:
+        extracted_intentions = job['results'].get('intentions')
+        if extracted_intentions:
+            all_extracted_intentions.extend(extracted_intentions)
+            intentions_results.append({
+                'website': job['website'],
+                'pdf_link': job['pdf_link'],
+                'intentions': extracted_intentions,
+                'church_names': [c.get('name', 'Unknown') for c in job['churches']],
+            })
     
     # Merge extracted intentions with existing
     merged_intentions = intentions.merge_intentions(existing_intentions, all_extracted_intentions)
@@ -1,7 +1,19 @@
 """Utils package for bulletin analysis"""
+from . import sessions
+from . import http_cache
 from . import scraping
+from . import bulletin_store
+from . import pipeline
+from . import llm_engine
+from . import llm_cache
+from . import schemas
+from . import church_patches
+from . import prompts
 from . import llm
 from . import events
 from . import intentions
+from . import page_cache
+from . import page_selection
+from . import page_text
 from . import pdf_to_images
 from . import logging_config
\ No newline at end of file
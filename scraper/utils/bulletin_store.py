@@ -0,0 +1,154 @@
+"""
+Content-addressed bulletin store.
+Keeps each distinct bulletin PDF under its SHA-256 hash together with
+metadata (source URLs, first/last seen) and per-mode analysis results, so
+byte-identical bulletins are not re-analyzed by the LLM on later runs.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = Path(__file__).resolve().parent.parent / 'bulletins' / 'store'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(data):
+    """Stable SHA-256 of JSON-serializable data (e.g. the church context sent in a prompt)."""
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class BulletinStore:
+    """
+    Store layout:
+      <store_dir>/<aa>/<sha256>.pdf   - the bulletin bytes
+      <store_dir>/<aa>/<sha256>.json  - metadata and per-mode results
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self._lock = threading.Lock()
+
+    def _paths(self, sha):
+        folder = self.store_dir / sha[:2]
+        return folder / f'{sha}.pdf', folder / f'{sha}.json'
+
+    def _load_meta(self, sha):
+        _, meta_path = self._paths(sha)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable store metadata for {sha[:12]}: {str(e)[:50]}")
+            return None
+
+    def _save_meta(self, sha, meta):
+        _, meta_path = self._paths(sha)
+        tmp_path = meta_path.with_name(f'{meta_path.name}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def ingest(self, pdf_path, website, pdf_link, move=False):
+        """
+        Add a downloaded PDF to the store (if new) and record where it came from.
+        With move=True the downloaded file is moved into the store (or deleted
+        if the store already holds the same bytes) instead of copied; read the
+        bulletin from pdf_path(sha) afterwards.
+        Returns the SHA-256 of the PDF.
+        """
+        sha = hash_file(pdf_path)
+        size = os.path.getsize(pdf_path)
+        stored_pdf, _ = self._paths(sha)
+        now = datetime.now().isoformat()
+
+        with self._lock:
+            os.makedirs(stored_pdf.parent, exist_ok=True)
+            if not stored_pdf.exists():
+                tmp_path = stored_pdf.with_name(f'{stored_pdf.name}.tmp')
+                if move:
+                    os.replace(pdf_path, tmp_path)
+                else:
+                    shutil.copyfile(pdf_path, tmp_path)
+                os.replace(tmp_path, stored_pdf)
+            elif move:
+                os.remove(pdf_path)
+
+            meta = self._load_meta(sha)
+            if meta is None:
+                meta = {
+                    'sha256': sha,
+                    'size': size,
+                    'source_urls': [],
+                    'websites': [],
+                    'first_seen': now,
+                    'results': {},
+                }
+                logger.debug(f"New bulletin {sha[:12]} from {pdf_link[:60]}...")
+            if pdf_link not in meta['source_urls']:
+                meta['source_urls'].append(pdf_link)
+            if website not in meta['websites']:
+                meta['websites'].append(website)
+            meta['last_seen'] = now
+            self._save_meta(sha, meta)
+
+        return sha
+
+    def pdf_path(self, sha):
+        """Return the stored PDF path for a hash."""
+        return str(self._paths(sha)[0])
+
+    def get_result(self, sha, mode, model, prompt_version, context_hash=None):
+        """
+        Look up a stored result for a bulletin.
+        Returns (True, result) when the bulletin was already processed in this mode
+        with the same model, prompt version and context, otherwise (False, None).
+        """
+        with self._lock:
+            meta = self._load_meta(sha)
+        if not meta:
+            return False, None
+        entry = meta.get('results', {}).get(mode)
+        if (
+            entry
+            and entry.get('model') == model
+            and entry.get('prompt_version') == prompt_version
+            and entry.get('context_hash') == context_hash
+        ):
+            return True, entry.get('result')
+        return False, None
+
+    def record_result(self, sha, mode, model, prompt_version, result, context_hash=None):
+        """Store the result of analyzing a bulletin in a mode (replaces any earlier one)."""
+        with self._lock:
+            meta = self._load_meta(sha)
+            if meta is None:
+                logger.warning(f"Cannot record {mode} result for unknown bulletin {sha[:12]}")
+                return
+            meta.setdefault('results', {})[mode] = {
+                'model': model,
+                'prompt_version': prompt_version,
+                'context_hash': context_hash,
+                'processed_at': datetime.now().isoformat(),
+                'result': result,
+            }
+            self._save_meta(sha, meta)
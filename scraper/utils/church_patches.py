@@ -0,0 +1,371 @@
+"""
+Mass difference records and per-church patch updates for churches.json.
+The comparator returns typed difference rows (church id, field, bulletin
+value, database value, page, note). They are normalised here, rows whose
+values match are dropped, and the rest are rendered as the markdown report
+and turned into small JSON-Patch style operations on each church's
+schedule. Rows that cannot be mapped unambiguously are handed to a short
+per-church LLM call (see llm.patch_church). Only the patched records change.
+"""
+
+import copy
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Schedule fields a patch may touch; everything else in a record is left alone
+PATCHABLE_FIELDS = ('masses', 'daily_masses', 'confession', 'adoration')
+# Fields whose entries are a single time rather than a start/end range
+TIME_FIELDS = ('masses', 'daily_masses')
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_DAY = re.compile(r'\b(mon|tues?|wed(?:nes)?|thu(?:rs?)?|fri|sat(?:ur)?|sun)(?:day)?\b\.?', re.IGNORECASE)
+_TIME = re.compile(r'^(\d{1,2})(?::?(\d{2}))?\s*(a\.?m\.?|p\.?m\.?)?$', re.IGNORECASE)
+_MERIDIEM = re.compile(r'[ap]\.?m\.?', re.IGNORECASE)
+_RANGE_SPLIT = re.compile(r'\s*(?:-|–|—|\bto\b)\s*')
+# Notes that make a row a judgement call rather than a plain correction
+_UNCERTAIN = re.compile(
+    r'\?|unclear|uncertain|possibl|maybe|may be|might|misidentif|ambiguous|not sure|seasonal|temporar|special|only on',
+    re.IGNORECASE
+)
+# Cell values meaning "nothing scheduled"
+_EMPTY = {'', '-', '—', 'n/a', 'na', 'none', 'null', 'not listed', 'not found', 'missing', '(none)'}
+
+
+def normalize_time(value):
+    """Convert '5:30 PM', '17:30', '1730', '9am' or 'noon' to HHMM; None if unparseable."""
+    value = value.strip().lower()
+    if value == 'noon':
+        return '1200'
+    if value == 'midnight':
+        return '0000'
+    match = _TIME.match(value)
+    if not match:
+        return None
+    hours, minutes, meridiem = match.groups()
+    if minutes is None and not meridiem:
+        # A bare "5" could be morning or evening
+        return None
+    hours, minutes = int(hours), int(minutes or 0)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            return None
+        hours = hours % 12 + (12 if meridiem.startswith('p') else 0)
+    if hours > 23 or minutes > 59:
+        return None
+    return f"{hours:02d}{minutes:02d}"
+
+
+def _parse_value(value, field):
+    """
+    Parse a Bulletin/Database cell for a field.
+
+    Returns:
+        None for an empty cell, a time 'HHMM' for Mass fields, a (start, end)
+        tuple for confession/adoration, or False if the cell cannot be read
+    """
+    if value is None:
+        return None
+    value = str(value).strip().strip('*')
+    if value.lower() in _EMPTY:
+        return None
+    if field in TIME_FIELDS:
+        return normalize_time(value) or False
+    parts = _RANGE_SPLIT.split(value)
+    if len(parts) != 2:
+        return False
+    start, end = normalize_time(parts[0]), normalize_time(parts[1])
+    # "9:45 - 10:30 am": the meridiem on the end applies to the start too
+    meridiem = _MERIDIEM.search(parts[1])
+    if meridiem and not _MERIDIEM.search(parts[0]):
+        shared = normalize_time(f"{parts[0]} {meridiem.group(0)}")
+        if shared and end and shared <= end:
+            start = shared
+    if not start or not end:
+        return False
+    return (start, end)
+
+
+def classify_field(label):
+    """
+    Map a report Field label to (schedule field, day).
+    'Saturday Mass' -> ('masses', 'Saturday'), 'Daily Mass (Tue)' ->
+    ('daily_masses', 'Tuesday'), 'Confession (Sat)' -> ('confession', 'Saturday').
+
+    Returns:
+        (field, day) or (None, None) if the label is not understood
+    """
+    lowered = label.lower()
+    if 'confession' in lowered or 'reconciliation' in lowered:
+        field = 'confession'
+    elif 'adoration' in lowered or 'holy hour' in lowered:
+        field = 'adoration'
+    elif 'daily' in lowered or 'weekday' in lowered:
+        field = 'daily_masses'
+    elif 'mass' in lowered or 'vigil' in lowered:
+        field = 'masses'
+    else:
+        return None, None
+    days = {_day_name(match.group(1)) for match in _DAY.finditer(label)}
+    if len(days) != 1:
+        return None, None
+    return field, days.pop()
+
+
+def _day_name(abbreviation):
+    prefix = abbreviation[:3].lower()
+    return next(day for day in DAYS if day.lower().startswith(prefix))
+
+
+def clean_differences(differences, churches):
+    """
+    Normalise difference records and drop the ones that are not differences.
+    Times become HHMM (ranges "HHMM-HHMM", missing values None), each record
+    is attached to one of the bulletin's churches, and rows whose bulletin and
+    database values are equal after normalisation are removed.
+
+    Args:
+        differences: Difference dicts from the comparator
+        churches: Church dicts sharing the bulletin
+
+    Returns:
+        List of cleaned difference dicts, in the comparator's order
+    """
+    cleaned = []
+    dropped = 0
+    for diff in differences:
+        church = _resolve_church(diff.get('church_id'), churches)
+        if church is None:
+            logger.warning(f"⚠ Difference for unknown church '{diff.get('church_id')}' ignored: {diff.get('field')}")
+            continue
+        field, _ = classify_field(diff.get('field') or '')
+        bulletin = _normalize_value(diff.get('bulletin'), field)
+        database = _normalize_value(diff.get('database'), field)
+        if bulletin == database:
+            dropped += 1
+            continue
+        cleaned.append(dict(diff, church_id=church['id'], bulletin=bulletin, database=database))
+    if dropped:
+        logger.debug(f"Dropped {dropped} row(s) where bulletin and database agree")
+    return cleaned
+
+
+def _normalize_value(value, field):
+    """Canonical form of a cell: HHMM, "HHMM-HHMM", None when empty, else the stripped text."""
+    if value is None:
+        return None
+    parsed = _parse_value(value, field or 'masses')
+    if parsed is None:
+        return None
+    if isinstance(parsed, tuple):
+        return f"{parsed[0]}-{parsed[1]}"
+    if parsed is False and field is None:
+        # Unknown field: a range is still worth normalising
+        parsed = _parse_value(value, 'confession')
+        if isinstance(parsed, tuple):
+            return f"{parsed[0]}-{parsed[1]}"
+    return parsed or str(value).strip()
+
+
+def group_by_church(differences):
+    """Dict of church id -> difference rows, in first-seen order."""
+    grouped = {}
+    for diff in differences:
+        grouped.setdefault(diff['church_id'], []).append(diff)
+    return grouped
+
+
+def render_markdown(differences, churches):
+    """
+    Render difference records as the report's per-church tables.
+
+    Returns:
+        Markdown string ('' if there are no differences)
+    """
+    grouped = group_by_church(differences)
+    sections = []
+    for church in churches:
+        rows = grouped.get(church.get('id'))
+        if not rows:
+            continue
+        lines = [
+            f"### {church.get('name', 'Unknown')}",
+            "",
+            "| Field | Bulletin | Database | Page | Note |",
+            "|-------|----------|----------|------|------|",
+        ]
+        for row in rows:
+            cells = [row.get('field'), row.get('bulletin') or 'N/A', row.get('database') or 'N/A',
+                     row.get('page'), row.get('note')]
+            lines.append('| ' + ' | '.join(_cell(cell) for cell in cells) + ' |')
+        sections.append('\n'.join(lines))
+    return '\n\n'.join(sections)
+
+
+def _cell(value):
+    return '' if value is None else str(value).replace('|', '/').replace('\n', ' ').strip()
+
+
+def _resolve_church(church_id, churches):
+    """The bulletin's church a record refers to, by id, then by name, then the only church."""
+    for church in churches:
+        if church.get('id') == church_id:
+            return church
+    if church_id:
+        church = _match_church(str(church_id).replace('-', ' '), churches)
+        if church is not None:
+            return church
+    return churches[0] if len(churches) == 1 else None
+
+
+def _normalize_name(name):
+    name = name.lower().replace('saint ', 'st ').replace('st.', 'st ')
+    return ' '.join(re.sub(r"[^\w\s]|'s\b", ' ', name).split())
+
+
+def _match_church(heading, churches):
+    target = _normalize_name(heading)
+    for church in churches:
+        if _normalize_name(church.get('name', '')) == target:
+            return church
+    partial = [c for c in churches if target and (target in _normalize_name(c.get('name', ''))
+                                                   or _normalize_name(c.get('name', '')) in target)]
+    return partial[0] if len(partial) == 1 else None
+
+
+def patch_for_row(church, row):
+    """
+    Build patch operations for one difference row.
+
+    Returns:
+        List of operations (empty when the row is a no-op), or None if the row
+        cannot be applied without judgement and needs the LLM
+    """
+    field, day = classify_field(row['field'])
+    if field is None or _UNCERTAIN.search(row.get('note') or ''):
+        return None
+    bulletin = _parse_value(row['bulletin'], field)
+    database = _parse_value(row['database'], field)
+    if bulletin is False or database is False:
+        return None
+    if bulletin == database:
+        return []
+
+    entries = church.get(field) or []
+    if field in TIME_FIELDS:
+        matches = [i for i, e in enumerate(entries) if e.get('day') == day and e.get('time') == database]
+        present = any(e.get('day') == day and e.get('time') == bulletin for e in entries)
+    else:
+        matches = [i for i, e in enumerate(entries)
+                   if e.get('day') == day and (e.get('start'), e.get('end')) == database]
+        present = any(e.get('day') == day and (e.get('start'), e.get('end')) == bulletin for e in entries)
+
+    if database is None:
+        # Missing from the database: add it unless it is already there
+        if present:
+            return []
+        value = {'day': day, 'time': bulletin} if field in TIME_FIELDS else {'day': day, 'start': bulletin[0], 'end': bulletin[1]}
+        return [{'op': 'add', 'path': f'/{field}/-', 'value': value}]
+    if len(matches) != 1:
+        # The database value the model quoted is not (uniquely) in the record
+        return None
+    index = matches[0]
+    if bulletin is None:
+        return [{'op': 'remove', 'path': f'/{field}/{index}'}]
+    if present:
+        # The new time already exists for that day; drop the stale one
+        return [{'op': 'remove', 'path': f'/{field}/{index}'}]
+    if field in TIME_FIELDS:
+        return [{'op': 'replace', 'path': f'/{field}/{index}/time', 'value': bulletin}]
+    return [
+        {'op': 'replace', 'path': f'/{field}/{index}/start', 'value': bulletin[0]},
+        {'op': 'replace', 'path': f'/{field}/{index}/end', 'value': bulletin[1]},
+    ]
+
+
+def plan_patches(church, rows):
+    """
+    Split a church's difference rows into deterministic operations and rows
+    left for the LLM.
+
+    Returns:
+        (operations, unresolved_rows)
+    """
+    operations = []
+    unresolved = []
+    for row in rows:
+        ops = patch_for_row(church, row)
+        if ops is None:
+            unresolved.append(row)
+        else:
+            operations.extend(ops)
+    return _order_operations(operations), unresolved
+
+
+def _order_operations(operations):
+    """
+    Order operations built against the original record so they can be applied
+    one after another: replacements, then removals from the highest index
+    down, then appends.
+    """
+    def index(op):
+        parts = _path_parts(op['path'])
+        return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else -1
+
+    replaces = [op for op in operations if op['op'] == 'replace']
+    removes = sorted((op for op in operations if op['op'] == 'remove'), key=index, reverse=True)
+    adds = [op for op in operations if op['op'] == 'add']
+    return replaces + removes + adds
+
+
+def apply_patch(record, operations):
+    """
+    Apply JSON-Patch style add/remove/replace operations, in order, to a copy
+    of a record. Only PATCHABLE_FIELDS may be touched.
+
+    Returns:
+        The patched copy
+
+    Raises:
+        ValueError: if an operation is malformed or targets a disallowed path
+    """
+    patched = copy.deepcopy(record)
+    for op in operations:
+        parts = _path_parts(op.get('path', ''))
+        if not parts or parts[0] not in PATCHABLE_FIELDS:
+            raise ValueError(f"path not allowed: {op.get('path')}")
+        patched.setdefault(parts[0], [])
+        parent = patched
+        try:
+            for part in parts[:-1]:
+                parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise ValueError(f"path not found: {op.get('path')}")
+        key = parts[-1]
+        kind = op.get('op')
+        if kind != 'remove' and 'value' not in op:
+            raise ValueError(f"missing value for {op.get('path')}")
+        if isinstance(parent, list):
+            if kind == 'add':
+                parent.insert(len(parent) if key == '-' else int(key), op['value'])
+            elif kind == 'replace':
+                parent[int(key)] = op['value']
+            elif kind == 'remove':
+                del parent[int(key)]
+            else:
+                raise ValueError(f"unsupported op: {kind}")
+        else:
+            if kind in ('add', 'replace'):
+                parent[key] = op['value']
+            elif kind == 'remove':
+                parent.pop(key)
+            else:
+                raise ValueError(f"unsupported op: {kind}")
+    return patched
+
+
+def _path_parts(path):
+    if not path.startswith('/'):
+        return []
+    return [part.replace('~1', '/').replace('~0', '~') for part in path[1:].split('/')]
@@ -2,14 +2,32 @@
 Events utilities for extracting and managing parish events from bulletins.
 """
 
+import re
 import json
 import random
 import string
 import logging
-from datetime import datetime
+from datetime import date, datetime
+from difflib import SequenceMatcher
 
 logger = logging.getLogger(__name__)
 
+# Deduplication is settled locally where the answer is clear. Existing events
+# dated within DEDUP_WINDOW_DAYS of an extracted event and sharing a title word
+# with it are possible matches (a reworded or rescheduled event); only those
+# are sent to the LLM, at most MAX_DEDUP_EVENTS per bulletin, closest first
+DEDUP_WINDOW_DAYS = 21
+MAX_DEDUP_EVENTS = 60
+# Normalised titles at least this similar (0-1) on the same day are duplicates
+DUPLICATE_TITLE_SIMILARITY = 0.85
+# Title words too common to suggest two events are the same
+_GENERIC_WORDS = {
+    'with', 'from', 'this', 'that', 'your', 'parish', 'parishes', 'church', 'catholic',
+    'family', 'annual', 'event', 'events',
+}
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
 
 def generate_event_id():
     """
@@ -106,6 +124,117 @@ def prepare_existing_events_context(existing_events):
     ]
 
 
+def event_date(event):
+    """The event's date as a date object, or None if missing or invalid."""
+    try:
+        return date.fromisoformat(str(event.get('date'))[:10])
+    except ValueError:
+        return None
+
+
+def select_dedup_events(existing_events, anchor_dates, window_days=DEDUP_WINDOW_DAYS,
+                        max_events=MAX_DEDUP_EVENTS):
+    """
+    Bound the existing events used as LLM deduplication context.
+    Keeps events dated within window_days of any anchor date (the dates of
+    the events to match), closest first, capped at max_events.
+
+    Returns:
+        Selected events in date order
+    """
+    anchors = [anchor for anchor in anchor_dates if anchor is not None]
+    if not anchors:
+        return []
+    scored = []
+    for event in existing_events:
+        day = event_date(event)
+        if day is None:
+            continue
+        distance = min(abs((day - anchor).days) for anchor in anchors)
+        if distance <= window_days:
+            scored.append((distance, day, event))
+    scored.sort(key=lambda item: (item[0], item[1]))
+    selected = [event for _, _, event in scored[:max_events]]
+    return sorted(selected, key=event_date)
+
+
+def _normalize_title(title):
+    return _NON_WORD.sub(' ', (title or '').lower()).strip()
+
+
+def _same_title(a, b):
+    a, b = _normalize_title(a), _normalize_title(b)
+    if not a or not b:
+        return False
+    if a == b or sorted(a.split()) == sorted(b.split()):
+        return True
+    return SequenceMatcher(None, a, b).ratio() >= DUPLICATE_TITLE_SIMILARITY
+
+
+def _title_words(title):
+    return {word for word in _normalize_title(title).split() if len(word) >= 4 and word not in _GENERIC_WORDS}
+
+
+def _same_church(a, b):
+    return not a.get('church_id') or not b.get('church_id') or a.get('church_id') == b.get('church_id')
+
+
+def prematch_events(extracted_events, existing_events, window_days=DEDUP_WINDOW_DAYS):
+    """
+    Match extracted events to existing ones locally, before any LLM matching.
+    - Same date, same (or unspecified) church and a (near-)identical title:
+      duplicate, takes the existing event's id
+    - An id that already names an existing event of the family (a stored
+      result from an earlier run) is kept
+    - No existing event within window_days that shares a title word: new, id None
+    - Otherwise the match is unclear; id is set to None and the event is
+      returned with its possible matches for the LLM to settle
+
+    Args:
+        extracted_events: Extracted events (modified in place)
+        existing_events: All existing events of the bulletin's family of parishes
+        window_days: How far apart (in days) a rescheduled event may be
+
+    Returns:
+        (duplicates, new, unclear) where unclear is a list of
+        (event, candidate existing events) pairs
+    """
+    by_date = {}
+    for event in existing_events:
+        by_date.setdefault(event.get('date'), []).append(event)
+    family_ids = {event.get('id') for event in existing_events}
+    family_ids.discard(None)
+
+    duplicates = new = 0
+    unclear = []
+    for event in extracted_events:
+        match = next((
+            candidate for candidate in by_date.get(event.get('date'), [])
+            if _same_title(candidate.get('title'), event.get('title')) and _same_church(event, candidate)
+        ), None)
+        if match is not None:
+            event['id'] = match.get('id')
+            duplicates += 1
+            continue
+        if event.get('id') in family_ids:
+            continue
+        event['id'] = None
+        day = event_date(event)
+        words = _title_words(event.get('title'))
+        candidates = [
+            candidate for candidate in existing_events
+            if day is not None and event_date(candidate) is not None
+            and abs((event_date(candidate) - day).days) <= window_days
+            and words & _title_words(candidate.get('title'))
+            and _same_church(event, candidate)
+        ]
+        if candidates:
+            unclear.append((event, candidates))
+        else:
+            new += 1
+    return duplicates, new, unclear
+
+
 def merge_events(existing_events, new_events):
     """
     Merge new events with existing events.
@@ -0,0 +1,200 @@
+"""
+On-disk HTTP conditional-request cache for bulletin pages and PDFs.
+Stores the ETag/Last-Modified validators and body for each URL so repeat
+runs can send If-None-Match/If-Modified-Since and reuse the body on 304.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / '.cache' / 'http'
+MAX_ENTRY_AGE_DAYS = 30  # Entries not used for this long are pruned
+
+
+class HttpCache:
+    """
+    Validator and body cache keyed by URL.
+    Each entry is a pair of files named by the SHA-256 of the URL:
+    <key>.json (url, etag, last_modified, encoding, timestamps) and <key>.body.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, enabled=True):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f'{key}.json', self.cache_dir / f'{key}.body'
+
+    def _load_meta(self, url):
+        meta_path, body_path = self._paths(url)
+        if not body_path.exists():
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        # Guard against hash collisions or stale files
+        return meta if meta.get('url') == url else None
+
+    def conditional_headers(self, url):
+        """Return If-None-Match/If-Modified-Since headers for a cached URL."""
+        if not self.enabled:
+            return {}
+        meta = self._load_meta(url)
+        if not meta:
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, response, content):
+        """
+        Cache a 200 response body if the server sent a validator.
+        Returns True if the entry was written.
+        """
+        return self._store(url, response, lambda body_path: _atomic_write(body_path, content))
+
+    def store_file(self, url, response, path):
+        """
+        Cache a 200 response whose body was already streamed to path.
+        Returns True if the entry was written.
+        """
+        return self._store(url, response, lambda body_path: _atomic_copy(path, body_path))
+
+    def _store(self, url, response, write_body):
+        if not self.enabled:
+            return False
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'encoding': response.encoding,
+            'stored_at': time.time(),
+            'used_at': time.time(),
+        }
+        try:
+            with self._lock:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            # Write body first, then metadata, each atomically, so a reader never
+            # sees validators without a matching body
+            write_body(body_path)
+            _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+            return True
+        except OSError as e:
+            logger.warning(f"Failed to cache {url[:60]}...: {str(e)[:50]}")
+            return False
+
+    def load(self, url):
+        """Return the cached body bytes for a URL, or None."""
+        meta = self._load_meta(url)
+        if not meta:
+            return None
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        self._touch(url, meta)
+        return content
+
+    def load_text(self, url):
+        """Return the cached body decoded with the original response encoding, or None."""
+        meta = self._load_meta(url)
+        content = self.load(url)
+        if content is None:
+            return None
+        return content.decode(meta.get('encoding') or 'utf-8', errors='replace')
+
+    def restore_to(self, url, output_path):
+        """Copy the cached body for a URL to output_path. Returns True on success."""
+        meta = self._load_meta(url)
+        if not meta:
+            return False
+        _, body_path = self._paths(url)
+        try:
+            _atomic_copy(body_path, Path(output_path))
+        except OSError as e:
+            logger.warning(f"Failed to restore cached {url[:60]}...: {str(e)[:50]}")
+            return False
+        self._touch(url, meta)
+        return True
+
+    def prune(self, max_age_days=MAX_ENTRY_AGE_DAYS):
+        """Delete entries that have not been used for max_age_days. Returns count removed."""
+        if not self.cache_dir.exists():
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for meta_path in self.cache_dir.glob('*.json'):
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    used_at = json.load(f).get('used_at', 0)
+            except (OSError, json.JSONDecodeError):
+                used_at = 0
+            if used_at < cutoff:
+                body_path = meta_path.with_suffix('.body')
+                for path in (meta_path, body_path):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                removed += 1
+        if removed:
+            logger.debug(f"Pruned {removed} stale HTTP cache entries")
+        return removed
+
+    def _touch(self, url, meta):
+        meta_path, _ = self._paths(url)
+        meta['used_at'] = time.time()
+        try:
+            _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError:
+            pass
+
+
+def _atomic_write(path, data):
+    tmp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _atomic_copy(src, path):
+    tmp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, path)
+
+
+# Shared cache used by the scraping utilities
+_default_cache = HttpCache()
+
+
+def get_cache():
+    """Return the shared HTTP cache."""
+    return _default_cache
+
+
+def set_enabled(enabled):
+    """Enable or disable conditional requests against the shared cache."""
+    _default_cache.enabled = enabled
@@ -8,11 +8,16 @@ import base64
 import json
 import os
 import io
-import time
 import logging
-import requests
+import re
 from dotenv import load_dotenv
 
+from . import llm_engine
+from . import llm_cache
+from . import schemas
+from . import church_patches
+from . import prompts
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables from .env
@@ -32,74 +37,242 @@ if not OPENROUTER_API_KEY:
 PREFERRED_MODEL = 'google/gemini-3.1-flash-lite-preview'
 FALLBACK_MODEL = 'google/gemini-2.5-flash-lite'
 
-# Retry configuration
-MAX_RETRIES = 3
-RETRY_DELAY = [2, 5, 10]  # Seconds to wait between retries
+# Models tried in order when a request fails, returns no choices or returns
+# output that cannot be parsed (see configure_models)
+MODEL_CHAIN = [PREFERRED_MODEL, FALLBACK_MODEL]
+# Duplicate requests that are slower than the model's p90 to the next model
+HEDGE_REQUESTS = False
+
+# Stream responses (SSE). A streamed request is abandoned after this many
+# seconds without data (OpenRouter sends keep-alive comments while the model
+# is thinking) instead of after a fixed total time
+STREAM_RESPONSES = True
+STREAM_IDLE_TIMEOUT = 60
+
+# Prompt versions per mode. Bump a mode's version whenever its prompt changes
+# so bulletins already analyzed with the old prompt are processed again.
+PROMPT_VERSIONS = {
+    'mass': 4,
+    'events': 4,
+    'intentions': 3,
+}
+
+# Maximum bulletin pages rendered and sent per mode; which pages are sent
+# is chosen by page_selection from the PDF's text layer
+MAX_PAGES = {
+    'mass': 6,
+    'events': 8,
+    'intentions': 8,
+}
+
+# Requests go through the shared async engine (utils/llm_engine.py), which
+# pools connections, enforces RPM/TPM budgets and retries 429/5xx responses
+API_HEADERS = {
+    'Authorization': f'Bearer {OPENROUTER_API_KEY}',
+    'Content-Type': 'application/json'
+}
+llm_engine.configure(headers=API_HEADERS)
 
 # Import PDF to images conversion
-from .pdf_to_images import convert_pdf_to_images
+from .pdf_to_images import render_pdf_pages
+from .page_text import PageText
+from . import page_selection
 
 
-def _make_api_request(url, headers, payload, timeout, context=""):
+def configure_api_pool(pool_size, rpm=None, tpm=None):
+    """
+    Size the shared OpenRouter engine: pool_size is the number of requests in
+    flight (and pooled connections); rpm/tpm override the rate limit budgets
+    (0 disables a limit, None keeps the current value).
     """
-    Make API request with retry logic for 502/503 errors.
+    llm_engine.configure(pool_size=pool_size, rpm=rpm, tpm=tpm)
+
+
+def close_api_session():
+    """Close the shared OpenRouter client and its pooled connections."""
+    llm_engine.get_engine().close()
+
+
+def configure_models(chain=None, hedge=None):
+    """
+    Set the model fallback chain and whether slow requests are hedged.
     
     Args:
-        url: API endpoint URL
-        headers: Request headers
-        payload: Request payload
-        timeout: Request timeout in seconds
+        chain: List of model IDs, tried in order (None keeps the current chain)
+        hedge: If True, a request slower than its model's observed p90 latency is
+            also sent to the next model in the chain (None keeps the current setting)
+    """
+    global MODEL_CHAIN, HEDGE_REQUESTS
+    if chain:
+        MODEL_CHAIN = list(dict.fromkeys(chain))
+    if hedge is not None:
+        HEDGE_REQUESTS = hedge
+
+
+def configure_streaming(enabled=None, idle_timeout=None):
+    """
+    Turn response streaming on or off and set its idle timeout.
+    
+    Args:
+        enabled: If False, wait for whole responses with the per-call timeout (None keeps the current setting)
+        idle_timeout: Seconds without streamed data before a request is retried (None keeps the current value)
+    """
+    global STREAM_RESPONSES, STREAM_IDLE_TIMEOUT
+    if enabled is not None:
+        STREAM_RESPONSES = enabled
+    if idle_timeout is not None:
+        STREAM_IDLE_TIMEOUT = idle_timeout
+
+
+def primary_model(model=None):
+    """The model a request is sent to first."""
+    return model or MODEL_CHAIN[0]
+
+
+def model_chain(model=None):
+    """Chain of models for a request: the requested model first, then the configured fallbacks."""
+    model = primary_model(model)
+    return [model] + [m for m in MODEL_CHAIN if m != model]
+
+
+def _make_api_request(payload, timeout, context="", url=OPENROUTER_API_URL, cache_mode=None, validate=None,
+                      stop_when=None):
+    """
+    Make an API request through the shared request engine, failing over along
+    the model chain.
+    Keep-alive connections are reused across all analysis, extraction and
+    update calls; 429/5xx responses and timeouts are retried with jittered
+    exponential backoff, honouring Retry-After. If a model still fails, returns
+    no content, or returns content that validate rejects, the next model in
+    the chain is tried. With hedging on, a slow request is also sent to the
+    next model and the first good answer wins. Responses are streamed unless
+    streaming is turned off (see configure_streaming).
+    
+    Args:
+        payload: Request payload (its 'model' is tried first)
+        timeout: Request timeout in seconds when not streaming
         context: Context string for logging (e.g., church names)
+        url: API endpoint URL
+        cache_mode: If set ('mass', 'events' or 'intentions'), look the request up in
+            the response cache (keyed with that mode's prompt version) and store
+            successful responses there
+        validate: Optional function(content) -> bool rejecting unusable output
+        stop_when: Optional function(content_so_far) -> bool that ends a streamed
+            response early once the answer is known
     
     Returns:
-        Response JSON dict or None on failure
+        Response JSON dict or None on failure (the last response received if no
+        model produced valid output)
     """
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=timeout)
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.HTTPError as e:
-            # Retry on 502/503 errors (server issues)
-            if response.status_code in [502, 503]:
-                if attempt < MAX_RETRIES - 1:
-                    delay = RETRY_DELAY[attempt]
-                    logger.warning(f"⚠ {response.status_code} error for {context}, retrying in {delay}s (attempt {attempt + 1}/{MAX_RETRIES})")
-                    time.sleep(delay)
-                    continue
-                else:
-                    logger.error(f"API request failed after {MAX_RETRIES} retries for {context}: {response.status_code} {e}")
-                    return None
-            else:
-                # Don't retry other HTTP errors (401, 429, etc.)
-                logger.error(f"API request failed for {context}: {response.status_code} {e}")
-                return None
-                
-        except requests.exceptions.Timeout:
-            if attempt < MAX_RETRIES - 1:
-                delay = RETRY_DELAY[attempt]
-                logger.warning(f"⚠ Timeout for {context}, retrying in {delay}s (attempt {attempt + 1}/{MAX_RETRIES})")
-                time.sleep(delay)
-                continue
-            else:
-                logger.error(f"API request timed out after {MAX_RETRIES} retries for {context}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed for {context}: {str(e)[:100]}")
-            return None
-    
-    return None
+    cache = llm_cache.get_cache()
+    chain = model_chain(payload.get('model'))
+    if STREAM_RESPONSES:
+        timeout = STREAM_IDLE_TIMEOUT
+    stream_options = {'stream': STREAM_RESPONSES, 'stop_when': stop_when}
+    engine = llm_engine.get_engine()
+    last_result = None
+    # Models that already failed (including a losing hedge) are not tried again
+    tried = set()
+    for position, model in enumerate(chain):
+        if model in tried:
+            continue
+        model_payload = dict(payload, model=model)
+        if cache_mode:
+            cached = cache.get(cache.key_for(cache_mode, PROMPT_VERSIONS.get(cache_mode), model_payload))
+            if cached is not None and _is_valid_response(cached, validate):
+                logger.info(f"⚡ Using cached LLM response for: {context}")
+                return cached
+        
+        backup_model = next((m for m in chain[position + 1:] if m not in tried), None) if HEDGE_REQUESTS else None
+        if backup_model:
+            result, used_payload, attempted = engine.request_hedged(
+                url, model_payload, dict(payload, model=backup_model), timeout, context, **stream_options
+            )
+        else:
+            result = engine.request(url, model_payload, timeout, context, **stream_options)
+            used_payload, attempted = model_payload, [model_payload]
+        tried.update(p['model'] for p in attempted)
+        
+        if result is not None:
+            last_result = result
+        if _is_valid_response(result, validate):
+            if cache_mode:
+                key = cache.key_for(cache_mode, PROMPT_VERSIONS.get(cache_mode), used_payload)
+                cache.put(key, cache_mode, used_payload['model'], result)
+            if used_payload['model'] != chain[0]:
+                logger.info(f"✓ Fallback model {used_payload['model']} answered for: {context}")
+            return result
+        
+        next_model = next((m for m in chain[position + 1:] if m not in tried), None)
+        if next_model:
+            problem = "no response" if result is None else "unusable output"
+            failed = ', '.join(p['model'] for p in attempted)
+            logger.warning(f"⚠ {failed} gave {problem} for {context}, trying {next_model}")
+    return last_result
+
+def _is_valid_response(result, validate=None):
+    """True if a response has message content that passes validate (if given)."""
+    content = _response_content(result)
+    if content is None:
+        return False
+    if validate is None:
+        return True
+    try:
+        return bool(validate(content.strip()))
+    except Exception:
+        return False
+
+
+_EMPTY_DIFFERENCES = re.compile(r'^\s*(?:```(?:json)?\s*)?\{\s*"differences"\s*:\s*\[\s*\]')
+
+
+def _no_differences_seen(content):
+    """
+    True once mass analysis output opens with an empty differences array.
+    Used as the streaming stop check, since nothing after it is needed.
+    """
+    return bool(_EMPTY_DIFFERENCES.match(content))
+
+
+def _valid_items(kind, partial=True):
+    """
+    Validator for structured extraction output: a complete array, or (if
+    partial) at least some valid items salvaged from a truncated one.
+    """
+    def validate(content):
+        items, complete = schemas.parse_items(content, kind)
+        return items is not None and (complete or (partial and bool(items)))
+    return validate
+
+
+def _response_content(result):
+    """Return the message content of a chat completion response, or None."""
+    try:
+        return result['choices'][0]['message']['content'] or None
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def _image_mime_type(img_bytes):
+    """Detect the MIME type of encoded image bytes from their signature."""
+    if img_bytes[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if img_bytes[:4] == b'RIFF' and img_bytes[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/png'
 
 
 def _encode_image_to_base64(image):
     """
-    Encode an image (PIL Image or file path) to base64 data URL.
+    Encode an image to a base64 data URL.
+    Encoded bytes from the renderer (PNG, JPEG or WebP) are used as-is; file
+    paths are read without decoding. PIL Images (legacy pdf2image path) are
+    encoded to PNG.
     """
-    from PIL import Image
-    
-    if isinstance(image, str):
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        # Already encoded by the renderer, no decode/re-encode round trip
+        img_bytes = bytes(image)
+    elif isinstance(image, str):
         # It's a file path
         with open(image, 'rb') as f:
             img_bytes = f.read()
@@ -109,18 +282,48 @@ def _encode_image_to_base64(image):
         image.save(buffer, format='PNG')
         img_bytes = buffer.getvalue()
     
-    img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-    return f"data:image/png;base64,{img_base64}"
+    img_base64 = base64.b64encode(img_bytes).decode('ascii')
+    return f"data:{_image_mime_type(img_bytes)};base64,{img_base64}"
+
+
+def _render_selected_pages(pdf_path, mode):
+    """Render the pages of a bulletin most relevant to a mode (at most MAX_PAGES[mode])."""
+    page_numbers = page_selection.select_pages(pdf_path, mode, MAX_PAGES[mode])
+    return render_pdf_pages(pdf_path, page_numbers=page_numbers)
+
+
+def _describe_pages(images):
+    """Short description of the pages being sent, e.g. "3 text pages + 1 page image"."""
+    text_pages = sum(1 for img in images if isinstance(img, PageText))
+    image_pages = len(images) - text_pages
+    if not text_pages:
+        return f"{image_pages} page images"
+    if not image_pages:
+        return f"{text_pages} text pages"
+    return f"{text_pages} text pages + {image_pages} page images"
 
 
 def _build_image_content(images, prompt_text):
     """
     Build the content array for multi-image LLM request.
+    Each image is preceded by a "Page N" label with its page number in the
+    bulletin, since the images sent are not necessarily consecutive pages.
+    PageText entries (text-first analysis) are sent as text instead of images.
     """
     content = [{'type': 'text', 'text': prompt_text}]
+    if any(isinstance(img, PageText) for img in images):
+        content.append({
+            'type': 'text',
+            'text': 'Some bulletin pages are given as their extracted text instead of an image.'
+        })
     
     for i, img in enumerate(images):
+        page_number = getattr(img, 'page_number', i + 1)
+        if isinstance(img, PageText):
+            content.append({'type': 'text', 'text': f"Page {page_number} (extracted text):\n{img}"})
+            continue
         data_url = _encode_image_to_base64(img)
+        content.append({'type': 'text', 'text': f"Page {page_number}"})
         content.append({
             'type': 'image_url',
             'image_url': {
@@ -132,26 +335,30 @@ def _build_image_content(images, prompt_text):
     return content
 
 
-def analyze_bulletin(pdf_path, churches_data, model=None, use_images=True):
+def analyze_bulletin(pdf_path, churches_data, model=None, use_images=True, images=None, outcome=None):
     """
     Send a bulletin PDF to the LLM and ask it to compare against existing church data.
-    Returns markdown with any differences found, or empty string if no differences.
+    Returns typed difference records, normalised, with rows whose values match removed.
     
     Args:
         pdf_path: Path to the bulletin PDF file
         churches_data: Either a single church dict or a list of church dicts that share this bulletin
-        model: Optional model to use (overrides PREFERRED_MODEL)
+        model: Optional model to try first (default: first model in MODEL_CHAIN)
         use_images: If True, convert PDF to images for analysis (recommended for accuracy)
+        images: Optional pre-rendered page images (skips conversion when provided)
+        outcome: Optional dict; 'complete' is set to False when the answer was cut
+            off or partly invalid (the rows that could be read are still returned)
     
     Returns:
-        Markdown string with differences (empty if no differences), or None on error
+        List of difference dicts (church_id, field, bulletin, database, page, note);
+        empty if no differences, or None on error (including an answer with no readable row)
     """
     if not os.path.exists(pdf_path):
         logger.error(f"PDF not found: {pdf_path}")
         return None
     
-    # Use provided model or fall back to preferred model
-    model_to_use = model if model else PREFERRED_MODEL
+    # Use provided model or the head of the model chain
+    model_to_use = primary_model(model)
     
     # Ensure we have a list
     if isinstance(churches_data, dict):
@@ -162,45 +369,44 @@ def analyze_bulletin(pdf_path, churches_data, model=None, use_images=True):
     church_names = ', '.join([c.get('name', 'Unknown') for c in churches_list])
     
     try:
-        # Prepare the comparison prompt
-        prompt = f"""ONLY OUTPUT FINAL TABLES. NO EXPLANATIONS. NO PREAMBLE.
+        # Prepare the comparison prompt (schedule fields only, compact JSON)
+        churches_text, saved_chars = prompts.churches_context(churches_list, 'mass')
+        prompt = f"""ONLY OUTPUT FINAL JSON. NO EXPLANATIONS. NO PREAMBLE.
 
 Database:
-{json.dumps(churches_list, indent=2)}
-
-Compare the bulletin images to database. Output ONLY:
+{churches_text}
 
-"NO DIFFERENCES" if all times match exactly.
+Compare the bulletin pages to database. Output ONLY actual differences:
 
-OR table format with ONLY actual differences:
+{{"differences": [
+  {{"church_id": "id-from-database", "field": "Saturday Mass", "bulletin": "1700", "database": "1730", "page": "1", "note": "Optional"}}
+]}}
 
-### Church Name
-
-| Field | Bulletin | Database | Page | Note |
-|-------|----------|----------|------|------|
-| Saturday Mass | 1700 | 1730 | 1 | Optional |
+Output {{"differences": []}} if all times match exactly.
 
 RULES:
 - Only include rows where Bulletin value DIFFERS from Database value
 - Do NOT include rows where both are empty/missing
 - Do NOT include rows where both match
-- ALWAYS convert all times to 4-digit 24-hour format (e.g., 5:30 PM -> 1730, 9:45 AM -> 0945)
-- Be concise in Note field
-- Page number required (based on image order, starting from 1)
+- church_id: the "id" of the church in Database the row is about
+- field: the schedule entry and its day, e.g. "Saturday Mass", "Daily Mass (Tue)", "Confession (Sat)", "Adoration (Wed)"
+- ALWAYS convert all times to 4-digit 24-hour format (e.g., 5:30 PM -> 1730, 9:45 AM -> 0945); write ranges as "0945-1030"; use null when a side has no entry
+- Be concise in note (null if nothing to add)
+- Page number required (use the "Page N" label given before each page)
 - Ignore any non-mass/adoration/confession events
 - Ignore any special events/holidays
-- Ignore 'memorial masses' as they are not regular schedule
-- No text before or after tables"""
+- Ignore 'memorial masses' as they are not regular schedule"""
 
         if use_images:
-            # Convert PDF to images
-            images = convert_pdf_to_images(pdf_path, max_pages=6)  # Limit to first 6 pages
+            # Convert PDF to images unless the caller already rendered them
+            if images is None:
+                images = _render_selected_pages(pdf_path, 'mass')
             
             if not images:
-                logger.warning(f"Failed to convert PDF to images, falling back to PDF mode: {pdf_path}")
-                return _analyze_bulletin_pdf(pdf_path, churches_list, prompt, model_to_use, church_names)
+                logger.warning(f"No usable page images (conversion failed or every page was blank), falling back to PDF mode: {pdf_path}")
+                return _analyze_bulletin_pdf(pdf_path, churches_list, prompt, model_to_use, church_names, saved_chars, outcome)
             
-            logger.info(f"Analyzing {len(images)} page images for: {church_names}")
+            logger.info(f"Analyzing {_describe_pages(images)} for: {church_names}")
             
             # Build multi-image content
             content = _build_image_content(images, prompt)
@@ -212,47 +418,26 @@ RULES:
                     'max_tokens': 3000,
                     'exclude': True,
                     'enabled': True
-                }
+                },
+                'response_format': schemas.response_format(schemas.DIFFERENCES)
             }
         else:
             # Fall back to PDF mode
-            return _analyze_bulletin_pdf(pdf_path, churches_list, prompt, model_to_use, church_names)
+            return _analyze_bulletin_pdf(pdf_path, churches_list, prompt, model_to_use, church_names, saved_chars, outcome)
         
         # Call OpenRouter API
-        headers = {
-            'Authorization': f'Bearer {OPENROUTER_API_KEY}',
-            'Content-Type': 'application/json'
-        }
+        prompts.account('mass', payload, saved_chars, church_names)
+        result = _make_api_request(payload, 180, church_names, cache_mode='mass',
+                                   validate=_valid_items(schemas.DIFFERENCES), stop_when=_no_differences_seen)
         
-        result = _make_api_request(OPENROUTER_API_URL, headers, payload, 180, church_names)
-        
-        if result is None:
-            return None
-        
-        # Extract response content
-        if 'choices' in result and len(result['choices']) > 0:
-            content = result['choices'][0]['message']['content'].strip()
-            
-            logger.debug(f"LLM Raw Response:\n{content}")
-            
-            # Check if no differences
-            if content == "NO DIFFERENCES":
-                logger.info(f"✓ No differences found for: {church_names}")
-                return ""  # Return empty string for no differences
-            
-            # Return the markdown response
-            logger.info(f"✓ Found differences for: {church_names}")
-            return content
-        else:
-            logger.error(f"No response from LLM for: {church_names}")
-            return None
+        return _parse_differences(result, churches_list, church_names, outcome)
     
     except Exception as e:
         logger.error(f"Error analyzing bulletin for {church_names}: {str(e)[:100]}")
         return None
 
 
-def _analyze_bulletin_pdf(pdf_path, churches_list, prompt, model_to_use, church_names):
+def _analyze_bulletin_pdf(pdf_path, churches_list, prompt, model_to_use, church_names, saved_chars=0, outcome=None):
     """
     Legacy PDF-based analysis (fallback when image conversion fails).
     """
@@ -265,11 +450,6 @@ def _analyze_bulletin_pdf(pdf_path, churches_list, prompt, model_to_use, church_
         
         logger.info(f"Analyzing PDF (fallback mode) for: {church_names}")
         
-        headers = {
-            'Authorization': f'Bearer {OPENROUTER_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
         # Build payload for PDF upload fallback
         payload = {
             'model': model_to_use,
@@ -292,143 +472,196 @@ def _analyze_bulletin_pdf(pdf_path, churches_list, prompt, model_to_use, church_
                 'max_tokens': 3000,
                 'exclude': True,
                 'enabled': True
-            }
+            },
+            'response_format': schemas.response_format(schemas.DIFFERENCES)
         }
 
-        result = _make_api_request(OPENROUTER_API_URL, headers, payload, 120, church_names)
-        
-        if result is None:
-            return None
+        prompts.account('mass', payload, saved_chars, church_names)
+        result = _make_api_request(payload, 120, church_names, cache_mode='mass',
+                                   validate=_valid_items(schemas.DIFFERENCES), stop_when=_no_differences_seen)
         
-        if 'choices' in result and len(result['choices']) > 0:
-            content = result['choices'][0]['message']['content'].strip()
-            
-            if content == "NO DIFFERENCES":
-                logger.info(f"✓ No differences found for: {church_names}")
-                return ""
-            
-            logger.info(f"✓ Found differences for: {church_names}")
-            return content
-        else:
-            logger.error(f"No response from LLM for: {church_names}")
-            return None
+        return _parse_differences(result, churches_list, church_names, outcome)
             
     except Exception as e:
         logger.error(f"PDF analysis failed for {church_names}: {str(e)[:100]}")
         return None
 
 
-def update_churches_from_markdown(churches_data, markdown_report, markdown_results, model=None):
+def _parse_differences(result, churches_list, church_names, outcome=None):
+    """
+    Turn a comparison response into cleaned difference records.
+    An answer that was cut off or had only invalid rows is a failure, not
+    "no differences"; a partial answer with some rows sets outcome['complete']
+    to False so it is not stored as the bulletin's final result.
+    
+    Returns:
+        List of difference dicts (empty if none), or None on error
+    """
+    if result is None:
+        return None
+    content = _response_content(result)
+    if content is None:
+        logger.error(f"No response from LLM for: {church_names}")
+        return None
+    
+    logger.debug(f"LLM Raw Response:\n{content}")
+    differences, complete = schemas.parse_items(content.strip(), schemas.DIFFERENCES)
+    if differences is None or (not differences and not complete):
+        logger.error(f"Could not parse differences JSON for: {church_names}")
+        return None
+    if not complete:
+        logger.warning(f"⚠ Incomplete or partly invalid differences JSON; keeping {len(differences)} row(s) for: {church_names}")
+        if outcome is not None:
+            outcome['complete'] = False
+    
+    differences = church_patches.clean_differences(differences, churches_list)
+    if not differences:
+        logger.info(f"✓ No differences found for: {church_names}")
+    else:
+        logger.info(f"✓ Found {len(differences)} difference(s) for: {church_names}")
+    return differences
+
+
+def update_churches_from_differences(churches_data, mass_results, model=None, max_workers=4):
     """
-    Use LLM to analyze the markdown report and update churches.json accordingly.
+    Apply the Mass comparison findings to churches.json as per-church patches.
+    Each difference row becomes a small patch operation on that church's
+    schedule; rows that cannot be applied mechanically (unclear labels,
+    values not found in the record, hedged notes) are resolved by one short
+    LLM call per church, run in parallel. Only patched records are replaced.
     
     Args:
         churches_data: List of church dictionaries (the current churches.json)
-        markdown_report: The full markdown report content generated by analysis
-        markdown_results: Dict of bulletin websites and their analysis results
-        model: Optional model to use (overrides PREFERRED_MODEL)
+        mass_results: List of (bulletin website, result) tuples, where result
+            has the bulletin's cleaned 'differences'
+        model: Optional model to try first (default: first model in MODEL_CHAIN)
+        max_workers: Maximum parallel per-church LLM calls
     
     Returns:
         Updated list of church dictionaries with modifications applied
     """
-    logger = logging.getLogger(__name__)
+    from concurrent.futures import ThreadPoolExecutor
     
-    try:
-        logger.info("Sending churches.json and analysis report to LLM for updates...")
-        
-        # Use provided model or fall back to preferred model
-        model_to_use = model if model else PREFERRED_MODEL
-        
-        # Prepare the update prompt
-        prompt = f"""You are a JSON data manager for a Catholic church database. 
-
-CURRENT churches.json:
-{json.dumps(churches_data, indent=2)}
+    churches_by_id = {church.get('id'): church for church in churches_data}
+    patched = {}
+    llm_rows = {}
+    
+    for website, result in mass_results:
+        for church_id, rows in church_patches.group_by_church(result['differences']).items():
+            church = patched.get(church_id, churches_by_id.get(church_id))
+            if church is None:
+                continue
+            operations, unresolved = church_patches.plan_patches(church, rows)
+            if operations:
+                try:
+                    patched[church_id] = church_patches.apply_patch(church, operations)
+                    logger.info(f"✓ Applied {len(operations)} change(s) to {church.get('name')}")
+                except ValueError as e:
+                    logger.warning(f"⚠ Could not apply changes to {church.get('name')}: {e}")
+                    unresolved = rows
+            if unresolved:
+                llm_rows.setdefault(church_id, []).extend(unresolved)
+    
+    if llm_rows:
+        logger.info(f"Resolving {sum(len(r) for r in llm_rows.values())} unclear difference(s) "
+                    f"for {len(llm_rows)} church(es) with the LLM...")
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(llm_rows)))) as executor:
+            futures = {
+                church_id: executor.submit(
+                    patch_church, patched.get(church_id, churches_by_id[church_id]), rows, model
+                )
+                for church_id, rows in llm_rows.items()
+            }
+            for church_id, future in futures.items():
+                updated = future.result()
+                if updated is not None:
+                    patched[church_id] = updated
+    
+    changed = {church_id for church_id, church in patched.items() if church != churches_by_id.get(church_id)}
+    logger.info(f"✓ Updated {len(changed)} church record(s)")
+    return [patched[church.get('id')] if church.get('id') in changed else church for church in churches_data]
 
-ANALYSIS REPORT (differences found between bulletins and database):
-{markdown_report}
 
-TASK: Review the analysis report and update the churches.json to correct any discrepancies found in the bulletins.
+def patch_church(church, rows, model=None):
+    """
+    Ask the LLM for patch operations resolving one church's difference rows.
+    Only the church's schedule fields and the rows are sent.
+    
+    Args:
+        church: Church dict to patch
+        rows: Cleaned difference dicts for the church
+        model: Optional model to try first (default: first model in MODEL_CHAIN)
+    
+    Returns:
+        The patched church dict, or None if no valid patch was produced
+    """
+    name = church.get('name', 'Unknown')
+    schedule_text, saved_chars = prompts.church_context(church, 'update')
+    # The church's table without its heading and header rows
+    table = church_patches.render_markdown(rows, [church]).split('\n', 4)[-1]
+    prompt = f"""Update one church's schedule from a bulletin comparison.
 
-RULES:
-1. Only modify fields that have CONFIRMED differences in the analysis report
-2. Use exact times from the bulletin (in HHMM 24-hour format)
-3. Maintain all existing fields and structure
-4. Preserve the `offices` array and its office/hour structure exactly unless the analysis report explicitly confirms an office change
-5. Do NOT invent or assume data not in the report
-6. Return ONLY valid JSON, no explanations
+CHURCH: {name}
+SCHEDULE (JSON):
+{schedule_text}
 
-EXAMPLE CHANGE:
-If report shows "Saturday Mass | 1700 | 1730 | Page 1", change the Saturday mass from 1730 to 1700 in the church's masses array.
+DIFFERENCES (Field | Bulletin | Database | Page | Note):
+{table}
 
-OUTPUT: Return ONLY the complete updated churches.json as valid JSON array. No markdown, no explanations."""
+Return JSON Patch operations ({{"operations": [...]}}), applied in order, that correct the schedule.
+RULES:
+- Paths start with /masses, /daily_masses, /confession or /adoration and use array indexes (e.g. /masses/1/time, /masses/- to append)
+- Mass entries are {{"day", "time"}}; confession and adoration entries are {{"day", "start", "end"}}; times are HHMM 24-hour
+- Only change what a difference clearly supports; skip rows that match, are uncertain, or describe special one-off services
+- Return {{"operations": []}} if nothing should change"""
 
-        headers = {
-            'Authorization': f'Bearer {OPENROUTER_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            'model': model_to_use,
-            'messages': [
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            'timeout': 120
-        }
-        
-        result = _make_api_request(OPENROUTER_API_URL, headers, payload, 120, "JSON update")
-        
-        if result is None:
-            return churches_data
-        
-        if 'choices' in result and len(result['choices']) > 0:
-            content = result['choices'][0]['message']['content'].strip()
-            
-            # Extract JSON from response (in case there's any extra text)
-            import re
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
-            
-            if json_match:
-                json_str = json_match.group(0)
-                updated_churches = json.loads(json_str)
-                logger.info(f"✓ Successfully generated updated churches data")
-                return updated_churches
-            else:
-                logger.error("LLM response did not contain valid JSON array")
-                return churches_data
-        else:
-            logger.error("No response from LLM for JSON update")
-            return churches_data
+    payload = {
+        'model': primary_model(model),
+        'messages': [{'role': 'user', 'content': prompt}],
+        'response_format': schemas.response_format(schemas.PATCHES)
+    }
+    prompts.account('update', payload, saved_chars, name)
+    result = _make_api_request(payload, 60, f"{name} update", validate=_valid_items(schemas.PATCHES, partial=False))
+    content = _response_content(result)
+    if content is None:
+        logger.error(f"No response from LLM for update of: {name}")
+        return None
     
-    except requests.exceptions.RequestException as e:
-        logger.error(f"API request failed for JSON update: {str(e)[:100]}")
-        return churches_data
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse LLM response as JSON: {str(e)[:100]}")
-        return churches_data
-    except Exception as e:
-        logger.error(f"Error updating churches from markdown: {str(e)[:100]}")
-        return churches_data
+    operations, complete = schemas.parse_items(content, schemas.PATCHES)
+    if not complete:
+        # A partial list of ordered operations is not safe to apply
+        logger.warning(f"⚠ Incomplete patch for {name}; leaving it unchanged")
+        return None
+    for op in operations:
+        # Structured output fills unused entry keys with null
+        if isinstance(op.get('value'), dict):
+            op['value'] = {k: v for k, v in op['value'].items() if v is not None}
+    try:
+        updated = church_patches.apply_patch(church, operations)
+    except ValueError as e:
+        logger.warning(f"⚠ Rejected patch for {name}: {e}")
+        return None
+    if operations:
+        logger.info(f"✓ Applied {len(operations)} LLM change(s) to {name}")
+    return updated
 
 
-def extract_events_from_bulletin(pdf_path, churches_data, existing_events, model=None, use_images=True):
+def extract_events_from_bulletin(pdf_path, churches_data, model=None, use_images=True, images=None, outcome=None):
     """
     Extract upcoming events from a bulletin PDF using LLM.
     
     Args:
         pdf_path: Path to the bulletin PDF file
-        churches_data: List of church dicts that share this bulletin (simplified, with id, name, familyOfParishes)
-        existing_events: List of existing events for this family (simplified, for deduplication)
-        model: Optional model to use (overrides PREFERRED_MODEL)
+        churches_data: List of church dicts that share this bulletin (only id, name and familyOfParishes are sent)
+        model: Optional model to try first (default: first model in MODEL_CHAIN)
         use_images: If True, convert PDF to images for analysis (recommended for accuracy)
+        images: Optional pre-rendered page images (skips conversion when provided)
+        outcome: Optional dict; 'complete' is set to False when only part of the answer was usable
     
     Returns:
-        List of event dicts extracted from the bulletin, or None on error.
-        Events that match existing ones will have the same 'id'.
-        New events will have 'id': None.
+        List of event dicts extracted from the bulletin, or None on error (including an answer that could not be parsed, so it is never stored as an empty result).
+        IDs are not assigned here: the caller matches events to existing ones
+        (events.prematch_events, then match_events for unclear cases).
     """
     from datetime import datetime
     
@@ -436,8 +669,8 @@ def extract_events_from_bulletin(pdf_path, churches_data, existing_events, model
         logger.error(f"PDF not found: {pdf_path}")
         return None
     
-    # Use provided model or fall back to preferred model
-    model_to_use = model if model else PREFERRED_MODEL
+    # Use provided model or the head of the model chain
+    model_to_use = primary_model(model)
     
     church_names = ', '.join([c.get('name', 'Unknown') for c in churches_data])
     family_of_parishes = None
@@ -450,13 +683,11 @@ def extract_events_from_bulletin(pdf_path, churches_data, existing_events, model
         current_date = datetime.now().strftime('%Y-%m-%d')
         
         # Prepare the events extraction prompt
+        churches_text, saved_chars = prompts.churches_context(churches_data, 'events')
         prompt = f"""You are extracting UPCOMING SPECIAL EVENTS from a Catholic parish bulletin.
 
 CHURCHES IN THIS BULLETIN:
-{json.dumps(churches_data, indent=2)}
-
-EXISTING EVENTS (from previous extractions - use for deduplication):
-{json.dumps(existing_events, indent=2) if existing_events else "[]"}
+{churches_text}
 
 CURRENT DATE: {current_date}
 
@@ -477,10 +708,10 @@ DO NOT INCLUDE (these are handled separately):
 - Any recurring weekly activity without a specific one-time date
 - General statements like "Confession available before Mass"
 
-OUTPUT FORMAT (JSON array):
-[
+OUTPUT FORMAT (JSON object with an "events" array):
+{{"events": [
   {{
-    "id": "existing_id_if_match_or_null",
+    "id": null,
     "title": "Event Name",
     "description": "Brief description",
     "church_id": "church-slug-or-null",
@@ -492,7 +723,7 @@ OUTPUT FORMAT (JSON array):
     "location": "Specific location or null",
     "tags": ["category1", "category2"]
   }}
-]
+]}}
 
 PREDEFINED CATEGORIES (select one or more per event):
 1. community - Community outreach, food drives, volunteer events
@@ -514,20 +745,21 @@ RULES:
 - If date year is not specified, assume current year. If the date has already passed this year, assume next year.
 - If an event is for a specific church, set church_id and church_name from the CHURCHES list above
 - If an event is for the whole family of parishes (or church not specified), set church_id and church_name to null
-- DEDUPLICATION: If an event matches one in EXISTING EVENTS (same or very similar title, same date, same church), return the SAME id from existing. For new events, set id to null.
+- Always set id to null
 - TAGS: Select one or more categories from the list above. Use lowercase category names (e.g., "community", "social"). An event can have multiple applicable tags (e.g., a fundraising dinner could be ["fundraiser", "social"]).
-- Return empty array [] if no special events found
-- Return ONLY valid JSON array, no explanations or markdown"""
+- Return {{"events": []}} if no special events found
+- Return ONLY valid JSON, no explanations or markdown"""
 
         if use_images:
-            # Convert PDF to images
-            images = convert_pdf_to_images(pdf_path, max_pages=8)  # More pages for events
+            # Convert PDF to images unless the caller already rendered them
+            if images is None:
+                images = _render_selected_pages(pdf_path, 'events')
             
             if not images:
-                logger.warning(f"Failed to convert PDF to images, falling back to PDF mode: {pdf_path}")
-                return _extract_events_pdf(pdf_path, prompt, model_to_use, church_names)
+                logger.warning(f"No usable page images (conversion failed or every page was blank), falling back to PDF mode: {pdf_path}")
+                return _extract_events_pdf(pdf_path, prompt, model_to_use, church_names, saved_chars, outcome)
             
-            logger.info(f"Extracting events from {len(images)} page images for: {church_names}")
+            logger.info(f"Extracting events from {_describe_pages(images)} for: {church_names}")
             
             # Build multi-image content
             content = _build_image_content(images, prompt)
@@ -539,18 +771,15 @@ RULES:
                     'max_tokens': 5000,
                     'exclude': True,
                     'enabled': True
-                }
+                },
+                'response_format': schemas.response_format(schemas.EVENTS)
             }
         else:
-            return _extract_events_pdf(pdf_path, prompt, model_to_use, church_names)
+            return _extract_events_pdf(pdf_path, prompt, model_to_use, church_names, saved_chars, outcome)
         
         # Call OpenRouter API
-        headers = {
-            'Authorization': f'Bearer {OPENROUTER_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
-        result = _make_api_request(OPENROUTER_API_URL, headers, payload, 180, church_names)
+        prompts.account('events', payload, saved_chars, church_names)
+        result = _make_api_request(payload, 180, church_names, cache_mode='events', validate=_valid_items(schemas.EVENTS))
         
         if result is None:
             return None
@@ -561,35 +790,35 @@ RULES:
             
             logger.debug(f"LLM Events Raw Response:\n{content}")
             
-            # Try to parse JSON from response
-            import re
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
+            events, complete = schemas.parse_items(content, schemas.EVENTS)
             
-            if json_match:
-                json_str = json_match.group(0)
-                events = json.loads(json_str)
-                logger.info(f"✓ Extracted {len(events)} events for: {church_names}")
-                return events
-            elif content.strip() == '[]':
-                logger.info(f"✓ No events found for: {church_names}")
-                return []
-            else:
+            if events and not complete:
+                logger.warning(f"⚠ Incomplete or partly invalid events JSON; keeping {len(events)} valid event(s) for: {church_names}")
+                if outcome is not None:
+                    outcome['complete'] = False
+            # No array at all, or one with no readable, valid element: a failure, not an empty bulletin
+            if events is None or (not events and not complete):
                 logger.warning(f"Could not parse events JSON for: {church_names}")
                 logger.debug(f"Response content: {content[:500]}")
+                return None
+            if not events:
+                logger.info(f"✓ No events found for: {church_names}")
                 return []
+            logger.info(f"✓ Extracted {len(events)} events for: {church_names}")
+            return events
         else:
             logger.error(f"No response from LLM for events extraction: {church_names}")
             return None
     
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse events JSON for {church_names}: {str(e)[:100]}")
-        return []
+        return None
     except Exception as e:
         logger.error(f"Error extracting events for {church_names}: {str(e)[:100]}")
         return None
 
 
-def _extract_events_pdf(pdf_path, prompt, model_to_use, church_names):
+def _extract_events_pdf(pdf_path, prompt, model_to_use, church_names, saved_chars=0, outcome=None):
     """
     Legacy PDF-based events extraction (fallback when image conversion fails).
     """
@@ -601,11 +830,6 @@ def _extract_events_pdf(pdf_path, prompt, model_to_use, church_names):
         
         logger.info(f"Extracting events from PDF (fallback mode) for: {church_names}")
         
-        headers = {
-            'Authorization': f'Bearer {OPENROUTER_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
         payload = {
             'model': model_to_use,
             'messages': [
@@ -627,10 +851,12 @@ def _extract_events_pdf(pdf_path, prompt, model_to_use, church_names):
                 'max_tokens': 5000,
                 'exclude': True,
                 'enabled': True
-            }
+            },
+            'response_format': schemas.response_format(schemas.EVENTS)
         }
         
-        result = _make_api_request(OPENROUTER_API_URL, headers, payload, 120, church_names)
+        prompts.account('events', payload, saved_chars, church_names)
+        result = _make_api_request(payload, 120, church_names, cache_mode='events', validate=_valid_items(schemas.EVENTS))
         
         if result is None:
             return None
@@ -638,20 +864,21 @@ def _extract_events_pdf(pdf_path, prompt, model_to_use, church_names):
         if 'choices' in result and len(result['choices']) > 0:
             content = result['choices'][0]['message']['content'].strip()
             
-            import re
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
+            events, complete = schemas.parse_items(content, schemas.EVENTS)
             
-            if json_match:
-                json_str = json_match.group(0)
-                events = json.loads(json_str)
-                logger.info(f"✓ Extracted {len(events)} events for: {church_names}")
-                return events
-            elif content.strip() == '[]':
-                logger.info(f"✓ No events found for: {church_names}")
-                return []
-            else:
+            if events and not complete:
+                logger.warning(f"⚠ Incomplete or partly invalid events JSON; keeping {len(events)} valid event(s) for: {church_names}")
+                if outcome is not None:
+                    outcome['complete'] = False
+            # No array at all, or one with no readable, valid element: a failure, not an empty bulletin
+            if events is None or (not events and not complete):
                 logger.warning(f"Could not parse events JSON for: {church_names}")
+                return None
+            if not events:
+                logger.info(f"✓ No events found for: {church_names}")
                 return []
+            logger.info(f"✓ Extracted {len(events)} events for: {church_names}")
+            return events
         else:
             logger.error(f"No response from LLM for events extraction: {church_names}")
             return None
@@ -661,7 +888,72 @@ def _extract_events_pdf(pdf_path, prompt, model_to_use, church_names):
         return None
 
 
-def extract_intentions_from_bulletin(pdf_path, churches_data, model=None, use_images=True):
+def match_events(unclear_events, candidates, model=None, context=""):
+    """
+    Ask the LLM which existing event, if any, each unclear extracted event is.
+    Only events the local pre-matcher could not settle are sent, with the
+    existing events that might match them.
+    
+    Args:
+        unclear_events: Extracted event dicts
+        candidates: Existing events they might match (simplified, see events.prepare_existing_events_context)
+        model: Optional model to try first (default: first model in MODEL_CHAIN)
+        context: Context string for logging (e.g., church names)
+    
+    Returns:
+        Dict mapping an index into unclear_events to the matching existing id
+        (only matches naming one of the candidates), or None on error
+    """
+    new_events = [
+        {
+            'index': index,
+            'title': event.get('title'),
+            'date': event.get('date'),
+            'start_time': event.get('start_time'),
+            'church_id': event.get('church_id'),
+            'location': event.get('location'),
+        }
+        for index, event in enumerate(unclear_events)
+    ]
+    candidates_text, saved_chars = prompts.records_context(candidates)
+    prompt = f"""Match newly extracted parish events to events already in the database.
+
+NEW EVENTS:
+{prompts.compact_json(new_events)}
+
+EXISTING EVENTS:
+{candidates_text}
+
+For each new event, give the id of the existing event that is the SAME event (the title may be reworded, or the event moved to another date), or null if it is a different event. Recurring series (e.g. weekly sessions on different dates) are different events.
+
+Return {{"matches": [{{"index": 0, "id": "existing_id_or_null"}}, ...]}} with one entry per new event."""
+
+    payload = {
+        'model': primary_model(model),
+        'messages': [{'role': 'user', 'content': prompt}],
+        'response_format': schemas.response_format(schemas.MATCHES)
+    }
+    prompts.account('events', payload, saved_chars, f"{context} matching")
+    result = _make_api_request(payload, 60, f"{context} event matching", cache_mode='events',
+                               validate=_valid_items(schemas.MATCHES))
+    content = _response_content(result)
+    if content is None:
+        logger.error(f"No response from LLM for event matching: {context}")
+        return None
+    
+    matches, _ = schemas.parse_items(content, schemas.MATCHES)
+    if matches is None:
+        logger.warning(f"Could not parse event matches for: {context}")
+        return None
+    known_ids = {candidate.get('id') for candidate in candidates}
+    return {
+        match['index']: match['id']
+        for match in matches
+        if 0 <= match['index'] < len(unclear_events) and match.get('id') in known_ids and match['id'] is not None
+    }
+
+
+def extract_intentions_from_bulletin(pdf_path, churches_data, model=None, use_images=True, images=None, outcome=None):
     """
     Extract Mass intentions from a bulletin PDF using LLM.
     
@@ -672,12 +964,14 @@ def extract_intentions_from_bulletin(pdf_path, churches_data, model=None, use_im
     
     Args:
         pdf_path: Path to the bulletin PDF file
-        churches_data: List of church dicts that share this bulletin (with id, name, masses, daily_masses)
-        model: Optional model to use (overrides PREFERRED_MODEL)
+        churches_data: List of church dicts that share this bulletin (only id, name, masses and daily_masses are sent)
+        model: Optional model to try first (default: first model in MODEL_CHAIN)
         use_images: If True, convert PDF to images for analysis
+        images: Optional pre-rendered page images (skips conversion when provided)
+        outcome: Optional dict; 'complete' is set to False when only part of the answer was usable
     
     Returns:
-        List of intention dicts extracted from the bulletin, or None on error.
+        List of intention dicts extracted from the bulletin, or None on error (including an answer that could not be parsed, so it is never stored as an empty result).
         Each dict has: church_id, date, time, intentions (array of {for, by}).
     """
     from datetime import datetime
@@ -686,13 +980,14 @@ def extract_intentions_from_bulletin(pdf_path, churches_data, model=None, use_im
         logger.error(f"PDF not found: {pdf_path}")
         return None
     
-    model_to_use = model if model else PREFERRED_MODEL
+    model_to_use = primary_model(model)
     
     church_names = ', '.join([c.get('name', 'Unknown') for c in churches_data])
     
     try:
         current_date = datetime.now().strftime('%Y-%m-%d')
         
+        churches_text, saved_chars = prompts.churches_context(churches_data, 'intentions')
         prompt = f"""You are extracting MASS INTENTIONS from a Catholic parish bulletin.
 
 Mass intentions are specific prayer requests that are offered during a particular Mass.
@@ -706,15 +1001,15 @@ They are typically listed in the bulletin under headings like "Mass Intentions",
 The "†" symbol (cross/dagger) before a name indicates someone who is deceased.
 
 CHURCHES IN THIS BULLETIN:
-{json.dumps(churches_data, indent=2)}
+{churches_text}
 
 CURRENT DATE: {current_date}
 
 TASK: Extract ALL Mass intentions listed in the bulletin. For each Mass that has intentions listed,
 create an entry with the church, date, time, and all intentions for that Mass.
 
-OUTPUT FORMAT (JSON array):
-[
+OUTPUT FORMAT (JSON object with an "intentions" array):
+{{"intentions": [
   {{
     "church_id": "church-slug-id",
     "date": "YYYY-MM-DD",
@@ -726,7 +1021,7 @@ OUTPUT FORMAT (JSON array):
       }}
     ]
   }}
-]
+]}}
 
 RULES:
 - Extract EVERY Mass intention listed, including daily Masses and weekend Masses
@@ -737,18 +1032,19 @@ RULES:
 - Convert all times to 24-hour HHMM format (e.g., 5:00 PM -> 1700, 9:00 AM -> 0900)
 - Use the church_id from the CHURCHES list above. If multiple churches share this bulletin, match each Mass to the correct church based on the schedule or context.
 - If you cannot determine which specific church a Mass belongs to, use the first church's id.
-- Return empty array [] if no Mass intentions are found in the bulletin
-- Return ONLY valid JSON array, no explanations or markdown
+- Return {{"intentions": []}} if no Mass intentions are found in the bulletin
+- Return ONLY valid JSON, no explanations or markdown
 - Do NOT confuse "Mass intentions" with general prayer requests / "prayers of the faithful" / intercessions — only extract specific named intentions tied to a specific Mass date and time"""
 
         if use_images:
-            images = convert_pdf_to_images(pdf_path, max_pages=8)
+            if images is None:
+                images = _render_selected_pages(pdf_path, 'intentions')
             
             if not images:
-                logger.warning(f"Failed to convert PDF to images, falling back to PDF mode: {pdf_path}")
-                return _extract_intentions_pdf(pdf_path, prompt, model_to_use, church_names)
+                logger.warning(f"No usable page images (conversion failed or every page was blank), falling back to PDF mode: {pdf_path}")
+                return _extract_intentions_pdf(pdf_path, prompt, model_to_use, church_names, saved_chars, outcome)
             
-            logger.info(f"Extracting intentions from {len(images)} page images for: {church_names}")
+            logger.info(f"Extracting intentions from {_describe_pages(images)} for: {church_names}")
             
             content = _build_image_content(images, prompt)
             
@@ -759,17 +1055,14 @@ RULES:
                     'max_tokens': 5000,
                     'exclude': True,
                     'enabled': True
-                }
+                },
+                'response_format': schemas.response_format(schemas.INTENTIONS)
             }
         else:
-            return _extract_intentions_pdf(pdf_path, prompt, model_to_use, church_names)
-        
-        headers = {
-            'Authorization': f'Bearer {OPENROUTER_API_KEY}',
-            'Content-Type': 'application/json'
-        }
+            return _extract_intentions_pdf(pdf_path, prompt, model_to_use, church_names, saved_chars, outcome)
         
-        result = _make_api_request(OPENROUTER_API_URL, headers, payload, 180, church_names)
+        prompts.account('intentions', payload, saved_chars, church_names)
+        result = _make_api_request(payload, 180, church_names, cache_mode='intentions', validate=_valid_items(schemas.INTENTIONS))
         
         if result is None:
             return None
@@ -779,35 +1072,36 @@ RULES:
             
             logger.debug(f"LLM Intentions Raw Response:\n{content}")
             
-            import re
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
+            intentions_list, complete = schemas.parse_items(content, schemas.INTENTIONS)
             
-            if json_match:
-                json_str = json_match.group(0)
-                intentions_list = json.loads(json_str)
-                total_intentions = sum(len(m.get('intentions', [])) for m in intentions_list)
-                logger.info(f"✓ Extracted {len(intentions_list)} Masses with {total_intentions} intentions for: {church_names}")
-                return intentions_list
-            elif content.strip() == '[]':
-                logger.info(f"✓ No intentions found for: {church_names}")
-                return []
-            else:
+            if intentions_list and not complete:
+                logger.warning(f"⚠ Incomplete or partly invalid intentions JSON; keeping {len(intentions_list)} valid Mass(es) for: {church_names}")
+                if outcome is not None:
+                    outcome['complete'] = False
+            # No array at all, or one with no readable, valid element: a failure, not an empty bulletin
+            if intentions_list is None or (not intentions_list and not complete):
                 logger.warning(f"Could not parse intentions JSON for: {church_names}")
                 logger.debug(f"Response content: {content[:500]}")
+                return None
+            if not intentions_list:
+                logger.info(f"✓ No intentions found for: {church_names}")
                 return []
+            total_intentions = sum(len(m.get('intentions', [])) for m in intentions_list)
+            logger.info(f"✓ Extracted {len(intentions_list)} Masses with {total_intentions} intentions for: {church_names}")
+            return intentions_list
         else:
             logger.error(f"No response from LLM for intentions extraction: {church_names}")
             return None
     
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse intentions JSON for {church_names}: {str(e)[:100]}")
-        return []
+        return None
     except Exception as e:
         logger.error(f"Error extracting intentions for {church_names}: {str(e)[:100]}")
         return None
 
 
-def _extract_intentions_pdf(pdf_path, prompt, model_to_use, church_names):
+def _extract_intentions_pdf(pdf_path, prompt, model_to_use, church_names, saved_chars=0, outcome=None):
     """
     Legacy PDF-based intentions extraction (fallback when image conversion fails).
     """
@@ -819,11 +1113,6 @@ def _extract_intentions_pdf(pdf_path, prompt, model_to_use, church_names):
         
         logger.info(f"Extracting intentions from PDF (fallback mode) for: {church_names}")
         
-        headers = {
-            'Authorization': f'Bearer {OPENROUTER_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
         payload = {
             'model': model_to_use,
             'messages': [
@@ -845,10 +1134,12 @@ def _extract_intentions_pdf(pdf_path, prompt, model_to_use, church_names):
                 'max_tokens': 5000,
                 'exclude': True,
                 'enabled': True
-            }
+            },
+            'response_format': schemas.response_format(schemas.INTENTIONS)
         }
         
-        result = _make_api_request(OPENROUTER_API_URL, headers, payload, 120, church_names)
+        prompts.account('intentions', payload, saved_chars, church_names)
+        result = _make_api_request(payload, 120, church_names, cache_mode='intentions', validate=_valid_items(schemas.INTENTIONS))
         
         if result is None:
             return None
@@ -856,21 +1147,22 @@ def _extract_intentions_pdf(pdf_path, prompt, model_to_use, church_names):
         if 'choices' in result and len(result['choices']) > 0:
             content = result['choices'][0]['message']['content'].strip()
             
-            import re
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
+            intentions_list, complete = schemas.parse_items(content, schemas.INTENTIONS)
             
-            if json_match:
-                json_str = json_match.group(0)
-                intentions_list = json.loads(json_str)
-                total_intentions = sum(len(m.get('intentions', [])) for m in intentions_list)
-                logger.info(f"✓ Extracted {len(intentions_list)} Masses with {total_intentions} intentions for: {church_names}")
-                return intentions_list
-            elif content.strip() == '[]':
-                logger.info(f"✓ No intentions found for: {church_names}")
-                return []
-            else:
+            if intentions_list and not complete:
+                logger.warning(f"⚠ Incomplete or partly invalid intentions JSON; keeping {len(intentions_list)} valid Mass(es) for: {church_names}")
+                if outcome is not None:
+                    outcome['complete'] = False
+            # No array at all, or one with no readable, valid element: a failure, not an empty bulletin
+            if intentions_list is None or (not intentions_list and not complete):
                 logger.warning(f"Could not parse intentions JSON for: {church_names}")
+                return None
+            if not intentions_list:
+                logger.info(f"✓ No intentions found for: {church_names}")
                 return []
+            total_intentions = sum(len(m.get('intentions', [])) for m in intentions_list)
+            logger.info(f"✓ Extracted {len(intentions_list)} Masses with {total_intentions} intentions for: {church_names}")
+            return intentions_list
         else:
             logger.error(f"No response from LLM for intentions extraction: {church_names}")
             return None
@@ -0,0 +1,127 @@
+"""
+Persistent cache of LLM responses.
+Responses are stored in SQLite, keyed by a hash of the mode, its prompt
+version and the full request payload (model, prompt text and the encoded
+images or PDF), so re-running after a crash or a report-formatting change
+returns earlier answers in milliseconds instead of paying for them again.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = Path(__file__).resolve().parent.parent / '.cache' / 'llm_responses.sqlite3'
+DEFAULT_TTL_DAYS = 14
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache shared by all worker threads.
+    use_cached=False skips lookups (fresh responses are still stored).
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl_days=DEFAULT_TTL_DAYS, use_cached=True):
+        self.path = Path(path)
+        self.ttl_days = ttl_days
+        self.use_cached = use_cached
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        # Caller must hold self._lock
+        if self._conn is None:
+            os.makedirs(self.path.parent, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, mode TEXT, model TEXT, created_at REAL, response TEXT)'
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def key_for(mode, prompt_version, payload):
+        """Cache key for a request: mode, prompt version and a hash of the whole payload."""
+        digest = hashlib.sha256()
+        digest.update(f'{mode}:{prompt_version}:'.encode('utf-8'))
+        digest.update(json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached response dict for a key, or None if missing, expired or disabled."""
+        if not self.use_cached:
+            return None
+        cutoff = time.time() - self.ttl_days * 86400
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    'SELECT response FROM responses WHERE key = ? AND created_at >= ?', (key, cutoff)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)[:100]}")
+            return None
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            return None
+
+    def put(self, key, mode, model, response):
+        """Store a response (replacing any earlier one for the key)."""
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, mode, model, created_at, response) VALUES (?, ?, ?, ?, ?)',
+                    (key, mode, model, time.time(), json.dumps(response, ensure_ascii=False))
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to cache LLM response: {str(e)[:100]}")
+
+    def prune(self):
+        """Delete expired responses. Returns the number removed."""
+        if not self.path.exists():
+            return 0
+        cutoff = time.time() - self.ttl_days * 86400
+        try:
+            with self._lock:
+                conn = self._connection()
+                removed = conn.execute('DELETE FROM responses WHERE created_at < ?', (cutoff,)).rowcount
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to prune LLM cache: {str(e)[:100]}")
+            return 0
+        if removed:
+            logger.debug(f"Pruned {removed} expired LLM responses")
+        return removed
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Shared cache used by the LLM utilities
+_default_cache = ResponseCache()
+
+
+def get_cache():
+    """Return the shared LLM response cache."""
+    return _default_cache
+
+
+def set_use_cached(use_cached):
+    """Enable or disable serving responses from the shared cache."""
+    _default_cache.use_cached = use_cached
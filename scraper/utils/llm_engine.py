@@ -0,0 +1,484 @@
+"""
+Asynchronous request engine for OpenRouter calls.
+Worker threads submit requests to one background asyncio loop that owns a
+pooled httpx client. Global requests-per-minute and tokens-per-minute budgets
+are enforced with token buckets; 429 and 5xx responses are retried with
+jittered exponential backoff, and a Retry-After pauses every request, since
+rate limits apply to the whole account rather than a single call.
+Responses can be streamed (SSE), in which case the timeout bounds the silence
+between chunks rather than the whole response, and a caller-supplied check
+can end the stream as soon as the answer is known.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+import logging
+from collections import defaultdict, deque
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RPM = 120                  # Requests per minute (0 disables the limit)
+DEFAULT_TPM = 1_000_000            # Estimated tokens per minute (0 disables the limit)
+DEFAULT_POOL_SIZE = 10             # Max requests in flight / pooled connections
+MAX_RETRIES = 5
+BACKOFF_BASE = 2.0                 # Seconds; doubled on every attempt
+BACKOFF_MAX = 60.0
+MAX_RETRY_AFTER = 300.0            # Ignore absurd Retry-After values beyond this
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+CONNECT_TIMEOUT = 10
+
+# Hedging: once a model has this many successful requests on record, a request
+# still unanswered after that model's p90 latency is duplicated to a backup model
+HEDGE_MIN_SAMPLES = 10
+LATENCY_WINDOW = 200
+
+# Rough token estimates used to charge the TPM bucket before a request is sent;
+# the difference is settled from the response's usage once it arrives
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1100
+FILE_TOKENS = 3000
+
+
+class StreamError(Exception):
+    """A streamed response reported an error or ended before completing."""
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket holding up to one minute's budget.
+    Waiters are served in arrival order. The balance may go negative when a
+    request turns out to have used more than was estimated.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        """Wait until amount tokens are available, then take them. Returns seconds waited."""
+        # A request larger than the whole budget would otherwise never be sent
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return time.monotonic() - started
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def settle(self, extra):
+        """Charge (or refund, if negative) the difference between actual and estimated usage."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - extra)
+
+
+def estimate_tokens(payload):
+    """Estimate the tokens a chat completion request will consume."""
+    tokens = 0
+    for message in payload.get('messages', []):
+        content = message.get('content')
+        if isinstance(content, str):
+            tokens += len(content) // CHARS_PER_TOKEN
+            continue
+        for part in content or []:
+            if part.get('type') == 'text':
+                tokens += len(part.get('text', '')) // CHARS_PER_TOKEN
+            elif part.get('type') == 'image_url':
+                tokens += IMAGE_TOKENS
+            else:
+                tokens += FILE_TOKENS
+    # Output budget (reasoning plus answer)
+    tokens += payload.get('max_tokens') or 0
+    tokens += (payload.get('reasoning') or {}).get('max_tokens') or 0
+    return max(1, tokens)
+
+
+def _retry_after(response):
+    """Seconds to wait according to Retry-After or X-RateLimit-Reset, or None."""
+    value = response.headers.get('Retry-After')
+    if value:
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(max(0.0, delay), MAX_RETRY_AFTER)
+    reset = response.headers.get('X-RateLimit-Reset')
+    if reset:
+        try:
+            # OpenRouter sends the reset time as epoch milliseconds
+            reset_at = float(reset) / (1000 if float(reset) > 1e11 else 1)
+            return min(max(0.0, reset_at - time.time()), MAX_RETRY_AFTER)
+        except ValueError:
+            pass
+    return None
+
+
+def _backoff(attempt):
+    """Exponential backoff with jitter: between half and all of base * 2^attempt."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class RequestEngine:
+    """
+    Runs chat completion requests on a background event loop.
+    request() is a blocking wrapper, so the existing thread-based workers can
+    call it directly; the engine is started lazily on first use.
+    """
+
+    def __init__(self, headers=None, pool_size=DEFAULT_POOL_SIZE, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM,
+                 max_retries=MAX_RETRIES):
+        self.headers = dict(headers or {})
+        self.pool_size = max(1, pool_size)
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._semaphore = None
+        self._rpm_bucket = None
+        self._tpm_bucket = None
+        self._cooldown_until = 0.0
+        # Statistics
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.budget_wait = 0.0
+        self.hedged = 0
+        self.hedges_won = 0
+        self.early_stops = 0
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))  # model -> seconds
+        self._first_token = defaultdict(list)  # model -> seconds to first streamed token
+
+    def configure(self, pool_size=None, rpm=None, tpm=None, headers=None):
+        """Change limits or headers; a running engine is stopped and restarts on next use."""
+        self.close()
+        with self._lock:
+            if pool_size is not None:
+                self.pool_size = max(1, pool_size)
+            if rpm is not None:
+                self.rpm = rpm
+            if tpm is not None:
+                self.tpm = tpm
+            if headers is not None:
+                self.headers = dict(headers)
+
+    def _start(self):
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='llm-engine', daemon=True)
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self._loop, self._thread = loop, thread
+            logger.debug(
+                f"Started LLM engine: {self.pool_size} in flight, "
+                f"{self.rpm or 'unlimited'} RPM, {self.tpm or 'unlimited'} TPM"
+            )
+            return loop
+
+    async def _setup(self):
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        self._client = httpx.AsyncClient(headers=self.headers, limits=limits)
+        self._semaphore = asyncio.Semaphore(self.pool_size)
+        self._rpm_bucket = TokenBucket(self.rpm) if self.rpm else None
+        self._tpm_bucket = TokenBucket(self.tpm) if self.tpm else None
+
+    def close(self):
+        """Close the HTTP client and stop the background loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=10)
+        except Exception as e:
+            logger.debug(f"Error closing LLM client: {str(e)[:100]}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        loop.close()
+
+    def request(self, url, payload, timeout, context="", stream=False, stop_when=None):
+        """
+        Send a request and wait for the result.
+
+        Args:
+            url: API endpoint URL
+            payload: Chat completion payload
+            timeout: Seconds without data before the attempt is abandoned
+            context: Context string for logging
+            stream: If True, stream the response (SSE) and assemble it
+            stop_when: Optional function(content_so_far) -> bool; when it returns
+                True a streamed response is cut short and returned as is
+
+        Returns:
+            Response JSON dict or None on failure
+        """
+        loop = self._start()
+        future = asyncio.run_coroutine_threadsafe(
+            self._request(url, payload, timeout, context, stream, stop_when), loop
+        )
+        return future.result()
+
+    def latency_p90(self, model):
+        """Observed p90 latency of successful requests to a model, or None with too few samples."""
+        samples = sorted(self._latencies.get(model, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+
+    def request_hedged(self, url, payload, backup_payload, timeout, context="", stream=False, stop_when=None):
+        """
+        Send payload; if it has not answered within its model's observed p90
+        latency, also send backup_payload and take whichever succeeds first.
+        Without enough latency samples this is a plain request.
+
+        Returns:
+            (result, payload_used, attempted): result is the response dict or None,
+            and attempted lists the payloads whose requests ran to completion
+            (a request cancelled because the other one won is not included)
+        """
+        loop = self._start()
+        future = asyncio.run_coroutine_threadsafe(
+            self._hedged(url, payload, backup_payload, timeout, context, stream, stop_when), loop
+        )
+        return future.result()
+
+    async def _hedged(self, url, payload, backup_payload, timeout, context, stream, stop_when):
+        primary = asyncio.ensure_future(self._request(url, payload, timeout, context, stream, stop_when))
+        hedge_after = self.latency_p90(payload.get('model'))
+        if hedge_after is None:
+            return await primary, payload, [payload]
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result(), payload, [payload]
+
+        self.hedged += 1
+        logger.info(
+            f"⏱ No answer from {payload.get('model')} for {context} after {hedge_after:.0f}s (p90), "
+            f"hedging with {backup_payload.get('model')}"
+        )
+        backup = asyncio.ensure_future(self._request(url, backup_payload, timeout, context, stream, stop_when))
+        pending = {primary: payload, backup: backup_payload}
+        attempted = []
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                used = pending.pop(task)
+                attempted.append(used)
+                result = task.result()
+                if result is not None:
+                    for other in pending:
+                        other.cancel()
+                    if task is backup:
+                        self.hedges_won += 1
+                    return result, used, attempted
+        return None, payload, attempted
+
+    async def _wait_for_budget(self, estimate):
+        # Global pause after a 429 with Retry-After
+        pause = self._cooldown_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        waited = 0.0
+        if self._rpm_bucket:
+            waited += await self._rpm_bucket.acquire(1)
+        if self._tpm_bucket:
+            waited += await self._tpm_bucket.acquire(estimate)
+        self.budget_wait += waited
+        if waited > 1:
+            logger.debug(f"Waited {waited:.1f}s for rate limit budget")
+
+    async def _request(self, url, payload, timeout, context, stream=False, stop_when=None):
+        estimate = estimate_tokens(payload)
+        # httpx applies the read timeout to each read, so for a stream (which
+        # carries chunks and keep-alive comments) it acts as an idle timeout
+        request_timeout = httpx.Timeout(timeout, connect=CONNECT_TIMEOUT)
+        model = payload.get('model')
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_budget(estimate)
+            delay = None
+            async with self._semaphore:
+                self.requests += 1
+                try:
+                    if stream:
+                        response, data = await self._post_streamed(url, payload, request_timeout, stop_when, context)
+                    else:
+                        response = await self._client.post(url, json=payload, timeout=request_timeout)
+                        data = None
+                except httpx.TimeoutException:
+                    reason = f"No data for {timeout}s" if stream else "Timeout"
+                except httpx.TransportError as e:
+                    reason = f"Connection error ({str(e)[:50] or type(e).__name__})"
+                except StreamError as e:
+                    reason = f"Stream error ({str(e)[:80]})"
+                else:
+                    if response.is_success:
+                        if data is None:
+                            try:
+                                data = response.json()
+                            except ValueError:
+                                logger.error(f"API returned invalid JSON for {context}")
+                                return None
+                        self._settle_usage(data, estimate)
+                        self._latencies[model].append(time.monotonic() - started)
+                        return data
+                    if response.status_code not in RETRY_STATUSES:
+                        # Not retryable (401, 400, 402, ...)
+                        logger.error(f"API request failed for {context}: {response.status_code} {response.text[:100]}")
+                        return None
+                    reason = f"{response.status_code} error"
+                    delay = _retry_after(response)
+                    if response.status_code == 429:
+                        self.rate_limited += 1
+                        pause = delay if delay is not None else _backoff(attempt)
+                        self._cooldown_until = max(self._cooldown_until, time.monotonic() + pause)
+
+            if attempt == self.max_retries:
+                logger.error(f"API request failed after {self.max_retries} retries for {context}: {reason}")
+                return None
+            if delay is None:
+                delay = _backoff(attempt)
+            self.retries += 1
+            logger.warning(
+                f"⚠ {reason} for {context}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})"
+            )
+            await asyncio.sleep(delay)
+        return None
+
+    async def _post_streamed(self, url, payload, request_timeout, stop_when, context):
+        """
+        POST with stream=True and assemble the server-sent events into the same
+        dict shape as a non-streamed chat completion.
+
+        Returns:
+            (response, data) where data is None if the request was not successful
+        """
+        sent = time.monotonic()
+        async with self._client.stream('POST', url, json=dict(payload, stream=True), timeout=request_timeout) as response:
+            if not response.is_success:
+                await response.aread()
+                return response, None
+            parts = []
+            finish_reason = None
+            usage = None
+            model = payload.get('model')
+            first_token = None
+            completed = False
+            async for line in response.aiter_lines():
+                # Blank lines separate events; ": OPENROUTER PROCESSING" comments are keep-alives
+                if not line.startswith('data:'):
+                    continue
+                chunk = line[5:].strip()
+                if chunk == '[DONE]':
+                    completed = True
+                    break
+                try:
+                    event = json.loads(chunk)
+                except ValueError:
+                    continue
+                if event.get('error'):
+                    error = event['error']
+                    raise StreamError(error.get('message', error) if isinstance(error, dict) else error)
+                usage = event.get('usage') or usage
+                model = event.get('model') or model
+                for choice in event.get('choices') or []:
+                    text = (choice.get('delta') or {}).get('content')
+                    if text:
+                        if first_token is None:
+                            first_token = time.monotonic() - sent
+                        parts.append(text)
+                    finish_reason = choice.get('finish_reason') or finish_reason
+                if stop_when and parts and stop_when(''.join(parts)):
+                    # Leaving the block closes the stream; the rest is never generated
+                    finish_reason = 'early_stop'
+                    self.early_stops += 1
+                    completed = True
+                    break
+            if not completed and finish_reason is None:
+                raise StreamError("connection closed before the response completed")
+
+        if first_token is not None:
+            self._first_token[payload.get('model')].append(first_token)
+            logger.debug(
+                f"Streamed response for {context}: first token after {first_token:.1f}s, "
+                f"complete after {time.monotonic() - sent:.1f}s ({finish_reason})"
+            )
+        data = {
+            'model': model,
+            'choices': [{
+                'message': {'role': 'assistant', 'content': ''.join(parts)},
+                'finish_reason': finish_reason,
+            }],
+        }
+        if usage:
+            data['usage'] = usage
+        return response, data
+
+    def first_token_stats(self):
+        """Per-model (median, p90, count) of seconds to first streamed token."""
+        stats = {}
+        for model, samples in self._first_token.items():
+            samples = sorted(samples)
+            if samples:
+                p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+                stats[model] = (samples[len(samples) // 2], p90, len(samples))
+        return stats
+
+    def _settle_usage(self, data, estimate):
+        usage = data.get('usage') if isinstance(data, dict) else None
+        if self._tpm_bucket and usage and usage.get('total_tokens'):
+            self._tpm_bucket.settle(usage['total_tokens'] - estimate)
+
+    def log_stats(self):
+        """Log request, retry and rate-limit counts for the run."""
+        if not self.requests:
+            return
+        logger.info(
+            f"LLM requests: {self.requests} sent, {self.retries} retried, "
+            f"{self.rate_limited} rate limited, {self.budget_wait:.1f}s waiting for rate limit budget"
+        )
+        if self.hedged:
+            logger.info(f"Hedged {self.hedged} slow request(s); the backup model answered first {self.hedges_won} time(s)")
+        for model, (median, p90, count) in self.first_token_stats().items():
+            logger.info(f"Time to first token for {model}: median {median:.1f}s, p90 {p90:.1f}s ({count} streamed)")
+        if self.early_stops:
+            logger.info(f"Stopped {self.early_stops} streamed response(s) early once the answer was known")
+
+
+# Shared engine used by the LLM utilities
+_default_engine = RequestEngine()
+
+
+def get_engine():
+    """Return the shared request engine."""
+    return _default_engine
+
+
+def configure(pool_size=None, rpm=None, tpm=None, headers=None):
+    """Configure the shared request engine (see RequestEngine.configure)."""
+    _default_engine.configure(pool_size=pool_size, rpm=rpm, tpm=tpm, headers=headers)
@@ -94,6 +94,8 @@ def setup_logging(level=logging.INFO):
     # Suppress verbose third-party loggers
     logging.getLogger('urllib3').setLevel(logging.WARNING)
     logging.getLogger('requests').setLevel(logging.WARNING)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    logging.getLogger('httpcore').setLevel(logging.WARNING)
     
     return logging.getLogger(__name__)
 
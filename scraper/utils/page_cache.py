@@ -0,0 +1,120 @@
+"""
+On-disk cache of rendered bulletin pages.
+Entries are keyed by (PDF content hash, page number, DPI, encoding) so a
+bulletin is only rasterised once across reruns and modes. The cache is
+bounded by total size and evicts least recently used pages first.
+"""
+
+import os
+import threading
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / '.cache' / 'pages'
+MAX_CACHE_BYTES = 500 * 1024 * 1024
+
+
+class PageCache:
+    """
+    Layout: <cache_dir>/<pdf hash[:2]>/<pdf hash>_p<page>_<dpi>_<encoding>.img
+    File modification times double as the LRU clock: hits touch the file.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Computed lazily on first write
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, pdf_hash, page, dpi, encoding):
+        return self.cache_dir / pdf_hash[:2] / f'{pdf_hash}_p{page}_{dpi}_{encoding}.img'
+
+    def get(self, pdf_hash, page, dpi, encoding):
+        """Return cached image bytes for a page, or None."""
+        if not self.enabled or not pdf_hash:
+            return None
+        path = self._path(pdf_hash, page, dpi, encoding)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.debug(f"Page cache read failed for {path.name}: {str(e)[:50]}")
+            return None
+
+    def put(self, pdf_hash, page, dpi, encoding, data):
+        """Store image bytes for a page, evicting old pages if over the size limit."""
+        if not self.enabled or not pdf_hash:
+            return
+        path = self._path(pdf_hash, page, dpi, encoding)
+        tmp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        try:
+            os.makedirs(path.parent, exist_ok=True)
+            previous = path.stat().st_size if path.exists() else 0
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"Page cache write failed for {path.name}: {str(e)[:50]}")
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan_size(self):
+        return sum(path.stat().st_size for path in self.cache_dir.glob('*/*.img'))
+
+    def _evict(self):
+        # Caller must hold self._lock
+        entries = []
+        for path in self.cache_dir.glob('*/*.img'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        # Evict down to 90% so we do not rescan on every subsequent write
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                total -= size
+        self._total_bytes = total
+        logger.debug(f"Evicted {removed} cached page(s); cache now {total / (1024 * 1024):.1f} MB")
+
+
+# Shared cache used by the renderer
+_default_cache = PageCache()
+
+
+def get_cache():
+    """Return the shared page cache."""
+    return _default_cache
+
+
+def set_max_bytes(max_bytes):
+    """Resize the shared page cache (0 disables it)."""
+    _default_cache.max_bytes = max_bytes
@@ -0,0 +1,152 @@
+"""
+Page relevance selection using the PDF's embedded text layer.
+Scores each page per mode by keyword and pattern matches so only the pages
+likely to hold Mass times, events or intentions are rendered and sent,
+wherever they sit in the bulletin.
+"""
+
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+# Pages beyond this are never considered
+SCAN_PAGES = 24
+# Pages with less extracted text than this are treated as image-only
+MIN_TEXT_CHARS = 80
+# Each pattern counts at most this many times per page, so one long list
+# does not drown out everything else
+MAX_MATCHES_PER_PATTERN = 5
+
+_TIME = r'\b\d{1,2}(?::\d{2})?\s*(?:a\.?m\b\.?|p\.?m\b\.?|noon)'
+_WEEKDAY = r'\b(?:mon|tues?|wed(?:nes)?|thu(?:rs?)?|fri|sat(?:ur)?|sun)(?:day)?s?\b'
+_MONTH = (
+    r'\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|'
+    r'sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?\s+\d{1,2}\b'
+)
+
+# (pattern, weight) per mode; patterns are matched case-insensitively
+MODE_PATTERNS = {
+    'mass': [
+        (r'\bmass(?:es)?\b|\bmesse\b|\bmisa\b|\bmsza\b', 3),
+        (r'\bmass (?:times|schedule)|\bweekend masses\b|\bweekday masses\b', 6),
+        (r'\bconfessions?\b|\breconciliation\b', 3),
+        (r'\badoration\b|\bexposition\b', 2),
+        (r'\bvigil\b|\bliturgy\b', 1),
+        (_TIME, 1),
+        (_WEEKDAY, 1),
+    ],
+    'events': [
+        (_MONTH, 2),
+        (r'\b\d{1,2}/\d{1,2}\b', 1),
+        (_TIME, 1),
+        (r'\bjoin us\b|\ball (?:are )?welcome\b|\beveryone is welcome\b', 3),
+        (r'\bregist(?:er|ration)\b|\btickets?\b|\brsvp\b', 3),
+        (r'\bdinner\b|\bbreakfast\b|\bpotluck\b|\bfundraiser\b|\bbingo\b|\bconcert\b', 2),
+        (r'\bretreat\b|\bmeeting\b|\bworkshop\b|\bsocial\b|\bbazaar\b|\bpilgrimage\b', 2),
+        (r'\bhall\b|\bevent\b|\bupcoming\b', 1),
+    ],
+    'intentions': [
+        (r'\bmass intentions?\b|\bintentions?\b', 4),
+        (r'\bsp(?:ecial)?\.? intention\b', 3),
+        (r'\bfor the (?:repose|soul) of\b|\bin memory of\b|\br\.?i\.?p\.?\b|\bdeceased\b', 3),
+        (r'(?:req(?:uested)?\.?\s+)?by\s+(?:the\s+)?family\b|\brequested by\b|\breq\.? by\b', 3),
+        (r'†|\+\s?[A-Z][a-z]+', 2),
+        (r'\bliving\b|\bthanksgiving\b|\bbirthday\b|\banniversary\b', 1),
+        (_TIME, 1),
+        (_WEEKDAY, 1),
+    ],
+}
+
+# Minimum score for a page to be considered relevant
+MIN_SCORE = {
+    'mass': 8,
+    'events': 8,
+    'intentions': 8,
+}
+
+_COMPILED = {
+    mode: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in patterns]
+    for mode, patterns in MODE_PATTERNS.items()
+}
+
+
+def page_texts(pdf_path, max_pages=SCAN_PAGES):
+    """
+    Extract the text layer of the first max_pages pages.
+
+    Returns:
+        List of page texts (empty strings for image-only pages), or [] on failure
+    """
+    if not PYMUPDF_AVAILABLE:
+        return []
+    try:
+        with fitz.open(pdf_path) as doc:
+            return [doc[page_num].get_text() for page_num in range(min(len(doc), max_pages))]
+    except Exception as e:
+        logger.debug(f"Could not read text layer of {pdf_path}: {str(e)[:100]}")
+        return []
+
+
+def score_page(text, mode):
+    """Relevance of a page's text for a mode (0 for image-only pages)."""
+    if len(text.strip()) < MIN_TEXT_CHARS:
+        return 0
+    score = 0
+    for pattern, weight in _COMPILED[mode]:
+        matches = sum(1 for _ in zip(range(MAX_MATCHES_PER_PATTERN), pattern.finditer(text)))
+        score += weight * matches
+    return score
+
+
+def select_pages(pdf_path, mode, max_pages, texts=None):
+    """
+    Choose which pages to send for a mode.
+    The highest-scoring relevant pages are kept (at most max_pages), in page order.
+    If no page scores as relevant (e.g. scanned bulletins without a text layer,
+    or a schedule embedded as an image) the first max_pages pages are used,
+    which matches the behaviour without selection.
+
+    Args:
+        pdf_path: Path to the PDF
+        mode: 'mass', 'events' or 'intentions'
+        max_pages: Maximum number of pages to select
+        texts: Optional page texts from page_texts (extracted if not given)
+
+    Returns:
+        List of 0-based page numbers in page order
+    """
+    if texts is None:
+        texts = page_texts(pdf_path)
+    scores = [score_page(text, mode) for text in texts]
+    relevant = [page_num for page_num, score in enumerate(scores) if score >= MIN_SCORE[mode]]
+
+    if not relevant:
+        if texts:
+            logger.debug(f"No {mode} pages scored as relevant in {pdf_path}, using the first {max_pages}")
+        total_pages = _page_count(pdf_path) if not texts else len(texts)
+        return list(range(min(total_pages, max_pages)))
+
+    top = sorted(relevant, key=lambda page_num: -scores[page_num])[:max_pages]
+    selected = sorted(top)
+    logger.debug(
+        f"Selected {mode} pages {[page_num + 1 for page_num in selected]} of {len(texts)} "
+        f"(scores {[scores[page_num] for page_num in selected]})"
+    )
+    return selected
+
+
+def _page_count(pdf_path):
+    if not PYMUPDF_AVAILABLE:
+        return 0
+    try:
+        with fitz.open(pdf_path) as doc:
+            return len(doc)
+    except Exception:
+        return 0
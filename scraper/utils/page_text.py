@@ -0,0 +1,104 @@
+"""
+Layout-aware text extraction for text-first analysis.
+Born-digital bulletins carry a full text layer, which is far cheaper to send
+than page images. Pages whose text is missing or garbled (scans, broken font
+encodings, schedules embedded as pictures) are left to the image renderer.
+"""
+
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+# Pages with less text than this are sent as images
+MIN_TEXT_CHARS = 80
+# Share of characters that may look like mojibake or unmapped glyphs
+MAX_GARBLED_RATIO = 0.01
+# Share of characters that must be ordinary letters, digits, spaces or punctuation
+MIN_CLEAN_CHAR_RATIO = 0.9
+# Share of words that must contain a vowel (broken font encodings produce consonant soup)
+MIN_VOWEL_WORD_RATIO = 0.6
+# Pages mostly covered by pictures keep their images unless they also hold a lot of text
+MAX_IMAGE_COVERAGE = 0.5
+IMAGE_PAGE_MIN_TEXT_CHARS = 400
+
+_CLEAN_CHAR = re.compile(r"[\w\s.,;:!?'\"()\[\]/&%$#@*+=<>|~^`{}\\–—‘’“”•·…°€£-]")
+_WORD = re.compile(r'[^\W\d_]{2,}')
+_VOWEL = re.compile(r'[aeiouyàáâãäåéèêëìíîïòóôõöùúûüÿœæąęő]', re.IGNORECASE)
+# UTF-8 text decoded as Latin-1/cp1252 ("Ã©", "â€™"), plus replacement and private-use characters
+_GARBLED = re.compile(r'Ã[\u0080-\u00bf]|â€|[\ufffd\ue000-\uf8ff]')
+
+
+class PageText(str):
+    """Extracted page text that remembers its 1-based page number in the PDF."""
+
+    def __new__(cls, text, page_number):
+        page = super().__new__(cls, text)
+        page.page_number = page_number
+        return page
+
+
+def extract_page_texts(pdf_path, page_numbers):
+    """
+    Extract layout-aware text for the given 0-based pages.
+    Text blocks are read in reading order (top-to-bottom, left-to-right) and
+    separated by blank lines, so columns and boxed notices stay together.
+
+    Returns:
+        Dict mapping page number -> text, with None for pages that should be
+        sent as images (no usable text layer); {} on failure
+    """
+    if not PYMUPDF_AVAILABLE:
+        return {}
+    texts = {}
+    try:
+        with fitz.open(pdf_path) as doc:
+            for page_num in page_numbers:
+                if not 0 <= page_num < len(doc):
+                    continue
+                page = doc[page_num]
+                blocks = page.get_text('blocks', sort=True)
+                text = '\n\n'.join(block[4].strip() for block in blocks if block[6] == 0 and block[4].strip())
+                if _image_coverage(page) > MAX_IMAGE_COVERAGE and len(text) < IMAGE_PAGE_MIN_TEXT_CHARS:
+                    texts[page_num] = None
+                else:
+                    texts[page_num] = text if is_usable_text(text) else None
+    except Exception as e:
+        logger.debug(f"Text extraction failed for {pdf_path}: {str(e)[:100]}")
+        return {}
+    return texts
+
+
+def is_usable_text(text):
+    """True if extracted text is long enough and does not look garbled."""
+    stripped = text.strip()
+    if len(stripped) < MIN_TEXT_CHARS:
+        return False
+    if len(_GARBLED.findall(stripped)) / len(stripped) > MAX_GARBLED_RATIO:
+        return False
+    clean = len(_CLEAN_CHAR.findall(stripped))
+    if clean / len(stripped) < MIN_CLEAN_CHAR_RATIO:
+        return False
+    words = _WORD.findall(stripped)
+    if not words:
+        return False
+    vowel_words = sum(1 for word in words if _VOWEL.search(word))
+    return vowel_words / len(words) >= MIN_VOWEL_WORD_RATIO
+
+
+def _image_coverage(page):
+    """Fraction of the page area covered by placed images (capped at 1)."""
+    page_area = page.rect.width * page.rect.height
+    if not page_area:
+        return 0
+    covered = 0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info['bbox']) & page.rect
+        covered += bbox.width * bbox.height
+    return min(1.0, covered / page_area)
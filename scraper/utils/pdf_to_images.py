@@ -4,14 +4,118 @@ Converts PDF pages to images for better LLM visual analysis.
 """
 
 import os
+import threading
 import logging
+import io
+import multiprocessing
+from collections import namedtuple
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import page_cache
+from .bulletin_store import hash_file
 
 logger = logging.getLogger(__name__)
 
+# Process pool for rendering pages in parallel across cores.
+# 0 disables the pool and renders in the calling thread.
+RENDER_PROCESSES = os.cpu_count() or 1
+
+_pool = None
+_pool_size = RENDER_PROCESSES
+_pool_lock = threading.Lock()
+
+# Vision models downscale large images internally (to roughly 2048px on the
+# long edge), so sending more pixels than that only inflates the upload
+MODEL_MAX_EDGE = 2048
+IMAGE_FORMATS = ('png', 'jpeg', 'webp')
+DEFAULT_QUALITY = {'jpeg': 80, 'webp': 80}
+MIME_TYPES = {'png': 'image/png', 'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+
+# Page trimming: borders are detected on a low-resolution grayscale preview.
+# A pixel is "ink" if it differs from the border colour by more than
+# TRIM_THRESHOLD levels; pages with less ink than BLANK_INK_RATIO are dropped.
+TRIM_PREVIEW_DPI = 36
+TRIM_THRESHOLD = 24
+TRIM_PADDING_PT = 6
+BLANK_INK_RATIO = 0.0005
+
+
+class ImageEncoding(namedtuple('ImageEncoding', ['format', 'quality', 'grayscale', 'max_edge', 'trim'],
+                               defaults=[True])):
+    """
+    How rendered pages are encoded for upload.
+    format is png, jpeg or webp; quality applies to jpeg/webp; max_edge caps
+    the long edge in pixels (None keeps the full render resolution); trim crops
+    uniform borders and drops blank pages.
+    """
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Short identifier used in page cache keys, e.g. jpeg-q80-gray-2048."""
+        parts = [self.format]
+        if self.quality is not None:
+            parts.append(f'q{self.quality}')
+        if self.grayscale:
+            parts.append('gray')
+        parts.append(str(self.max_edge) if self.max_edge else 'full')
+        if self.trim:
+            parts.append('trim')
+        return '-'.join(parts)
+
+    @property
+    def mime_type(self):
+        return MIME_TYPES[self.format]
+
+
+DEFAULT_ENCODING = ImageEncoding('png', None, False, MODEL_MAX_EDGE)
+
+
+def parse_image_encoding(spec):
+    """
+    Parse an encoding spec such as "jpeg,q=75,gray,max=1568" or "png".
+    Options: q=<1-100> (jpeg/webp), gray|color, max=<pixels>|max=full, trim|notrim.
+    Unspecified options take their defaults.
+    
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    tokens = [token.strip().lower() for token in spec.split(',') if token.strip()]
+    if not tokens or tokens[0] not in IMAGE_FORMATS:
+        raise ValueError(f"image format must be one of {', '.join(IMAGE_FORMATS)}: {spec!r}")
+    
+    image_format = tokens[0]
+    quality = DEFAULT_QUALITY.get(image_format)
+    grayscale = False
+    max_edge = MODEL_MAX_EDGE
+    trim = True
+    for token in tokens[1:]:
+        name, _, value = token.partition('=')
+        if name in ('gray', 'grey', 'grayscale') and not value:
+            grayscale = True
+        elif name == 'color' and not value:
+            grayscale = False
+        elif name in ('trim', 'notrim') and not value:
+            trim = name == 'trim'
+        elif name in ('q', 'quality') and value:
+            if image_format == 'png':
+                raise ValueError(f"quality does not apply to png: {spec!r}")
+            quality = int(value)
+            if not 1 <= quality <= 100:
+                raise ValueError(f"quality must be between 1 and 100: {spec!r}")
+        elif name in ('max', 'max-edge') and value:
+            max_edge = None if value == 'full' else int(value)
+            if max_edge is not None and max_edge <= 0:
+                raise ValueError(f"max edge must be positive: {spec!r}")
+        else:
+            raise ValueError(f"unknown image encoding option {token!r} in {spec!r}")
+    return ImageEncoding(image_format, quality, grayscale, max_edge, trim)
+
 # Try to import pdf2image, which requires poppler
 try:
-    from pdf2image import convert_from_path
+    from pdf2image import pdfinfo_from_path
     PDF2IMAGE_AVAILABLE = True
 except ImportError:
     PDF2IMAGE_AVAILABLE = False
@@ -25,102 +129,333 @@ except ImportError:
     PYMUPDF_AVAILABLE = False
 
 
-def convert_pdf_to_images(pdf_path, output_dir=None, dpi=150, max_pages=None):
+def configure_render_pool(processes):
+    """
+    Set the number of rendering processes (0 renders in the calling thread).
+    Any existing pool is shut down and recreated lazily with the new size.
     """
-    Convert a PDF to a list of images (one per page).
+    global _pool_size
+    shutdown_render_pool()
+    with _pool_lock:
+        _pool_size = max(0, processes)
+
+
+def shutdown_render_pool():
+    """Shut down the rendering process pool if it was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _get_render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None and _pool_size > 0 and PYMUPDF_AVAILABLE:
+            # spawn avoids forking a process that is running scraper/LLM threads
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_size,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            logger.debug(f"Started rendering pool with {_pool_size} process(es)")
+        return _pool
+
+
+def _render_pages_worker(pdf_path, page_numbers, dpi, encoding=DEFAULT_ENCODING):
+    """
+    Render the given pages of a PDF to encoded image bytes.
+    Blank pages come back as b'' when trimming is enabled.
+    Runs in a worker process (or in-thread as the fallback path).
+    """
+    colorspace = fitz.csGRAY if encoding.grayscale else fitz.csRGB
+    rendered = []
+    with fitz.open(pdf_path) as doc:
+        for page_num in page_numbers:
+            page = doc[page_num]
+            clip = None
+            if encoding.trim:
+                clip = _content_rect(page)
+                if clip is None:
+                    rendered.append(b'')
+                    continue
+            zoom = _page_zoom(page, dpi, encoding)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False, clip=clip)
+            rendered.append(_encode_pixmap(pix, encoding))
+    return rendered
+
+
+def _page_zoom(page, dpi, encoding):
+    """Zoom factor for a page at dpi, reduced so the long edge fits encoding.max_edge."""
+    zoom = dpi / 72
+    if encoding.max_edge:
+        # Downscale while rasterising rather than resizing afterwards
+        long_edge = max(page.rect.width, page.rect.height) * zoom
+        if long_edge > encoding.max_edge:
+            zoom *= encoding.max_edge / long_edge
+    return zoom
+
+
+def _content_rect(page):
+    """
+    Find the area of a page that differs from its border colour.
+    Returns a clip rectangle in page coordinates (the full page if there is
+    nothing to crop), or None if the page is blank.
+    """
+    from PIL import Image, ImageChops
+    
+    scale = TRIM_PREVIEW_DPI / 72
+    preview = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+    image = Image.frombytes('L', (preview.width, preview.height), preview.samples)
+    width, height = image.size
+    
+    # Border colour: the most common value along the outermost pixel ring
+    border = Image.new('L', (2 * (width + height), 1))
+    border.paste(image.crop((0, 0, width, 1)), (0, 0))
+    border.paste(image.crop((0, height - 1, width, height)), (width, 0))
+    border.paste(image.crop((0, 0, 1, height)).rotate(90, expand=True), (2 * width, 0))
+    border.paste(image.crop((width - 1, 0, width, height)).rotate(90, expand=True), (2 * width + height, 0))
+    histogram = border.histogram()
+    background = max(range(256), key=histogram.__getitem__)
+    
+    ink = ImageChops.difference(image, Image.new('L', image.size, background))
+    ink = ink.point(lambda value: 255 if value > TRIM_THRESHOLD else 0)
+    if ink.histogram()[255] < BLANK_INK_RATIO * width * height:
+        return None
+    
+    bbox = ink.getbbox()
+    if page.rotation or not bbox:
+        # Clip rectangles are in unrotated coordinates; only blank detection applies
+        return page.rect
+    x0, y0, x1, y1 = bbox
+    rect = fitz.Rect(
+        x0 / scale - TRIM_PADDING_PT,
+        y0 / scale - TRIM_PADDING_PT,
+        x1 / scale + TRIM_PADDING_PT,
+        y1 / scale + TRIM_PADDING_PT,
+    )
+    return rect & page.rect
+
+
+def _page_pixels(pdf_path, page_numbers, dpi, encoding):
+    """Untrimmed pixel count of each page as it would be rendered."""
+    with fitz.open(pdf_path) as doc:
+        pixels = []
+        for page_num in page_numbers:
+            page = doc[page_num]
+            zoom = _page_zoom(page, dpi, encoding)
+            pixels.append(round(page.rect.width * zoom) * round(page.rect.height * zoom))
+    return pixels
+
+
+def _image_pixels(data):
+    """Pixel count of encoded image bytes, read from the header only."""
+    from PIL import Image
+    if not data:
+        return 0
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+    return width * height
+
+
+def _encode_pixmap(pix, encoding):
+    if encoding.format == 'png':
+        return pix.tobytes("png")
+    if encoding.format == 'jpeg':
+        return pix.tobytes("jpeg", jpg_quality=encoding.quality)
+    # PyMuPDF has no WebP writer, so hand the raw samples to Pillow
+    from PIL import Image
+    image = Image.frombytes('L' if pix.n == 1 else 'RGB', (pix.width, pix.height), pix.samples)
+    buffer = io.BytesIO()
+    image.save(buffer, format='WEBP', quality=encoding.quality)
+    return buffer.getvalue()
+
+
+class PageImage(bytes):
+    """Encoded page image bytes that remember their 1-based page number in the PDF."""
+
+    def __new__(cls, data, page_number):
+        page = super().__new__(cls, data)
+        page.page_number = page_number
+        return page
+
+
+def _pages_to_render(pdf_path, max_pages, page_numbers=None):
+    with fitz.open(pdf_path) as doc:
+        total_pages = len(doc)
+    if page_numbers is not None:
+        return [page_num for page_num in page_numbers if 0 <= page_num < total_pages]
+    return list(range(min(total_pages, max_pages) if max_pages else total_pages))
+
+
+def render_pdf_pages(pdf_path, dpi=150, max_pages=None, pdf_hash=None, encoding=None, stats=None,
+                     page_numbers=None):
+    """
+    Render PDF pages to encoded image bytes, one entry per kept page in page order.
+    Each entry is a PageImage carrying its page number, since selected or
+    dropped pages mean list position and page number can differ.
+    Pages are served from the page cache when possible; the rest are rendered
+    in parallel on the process pool when it is enabled, falling back to
+    in-thread rendering if the pool is disabled or fails.
+    
+    If page_numbers (0-based) is given, exactly those pages are rendered instead
+    of the first max_pages. If stats is a dict, it is filled with this PDF's
+    trimming statistics (see render_pdfs).
+    
+    Returns:
+        List of PageImage byte strings (empty on failure)
+    """
+    pdf_hashes = {pdf_path: pdf_hash} if pdf_hash else None
+    all_stats = {} if stats is not None else None
+    pages = render_pdfs(
+        [pdf_path], dpi=dpi, max_pages=max_pages, pdf_hashes=pdf_hashes, encoding=encoding, stats=all_stats,
+        page_numbers={pdf_path: page_numbers} if page_numbers is not None else None
+    ).get(pdf_path, [])
+    if stats is not None:
+        stats.update(all_stats.get(pdf_path, {}))
+    return pages
+
+
+def render_pdfs(pdf_paths, dpi=150, max_pages=None, pdf_hashes=None, encoding=None, stats=None,
+                page_numbers=None):
+    """
+    Render pages of one or many PDFs to encoded image bytes.
+    Cached pages (keyed by PDF content hash, page, DPI and encoding) are reused;
+    every missing page is a separate pool task, so a single large bulletin
+    still spreads across all cores. With encoding.trim, borders are cropped and
+    blank pages are left out of the result.
     
     Args:
-        pdf_path: Path to the PDF file
-        output_dir: Optional directory to save images (if None, returns PIL images)
-        dpi: Resolution for rendering (default 150 for good quality/size balance)
-        max_pages: Maximum number of pages to convert (None for all)
+        pdf_paths: PDF files to render
+        dpi: Resolution for rendering
+        max_pages: Maximum number of pages per PDF (None for all)
+        page_numbers: Optional dict of pdf_path -> 0-based pages to render
+            (overrides max_pages for that PDF)
+        pdf_hashes: Optional dict of pdf_path -> SHA-256 (computed if missing)
+        encoding: ImageEncoding for the output (default: DEFAULT_ENCODING)
+        stats: Optional dict filled with pdf_path -> {pages, dropped, pixels,
+            pixels_saved, bytes, bytes_saved}; bytes_saved is estimated from the
+            kept pages' bytes per pixel
     
     Returns:
-        List of image paths if output_dir provided, else list of PIL Images
+        Dict mapping pdf_path -> list of PageImage bytes (empty list on failure)
     """
-    if not os.path.exists(pdf_path):
-        logger.error(f"PDF not found: {pdf_path}")
-        return []
+    if not PYMUPDF_AVAILABLE:
+        logger.error("PyMuPDF is required for page rendering. Install it: pip install PyMuPDF")
+        return {pdf_path: [] for pdf_path in pdf_paths}
     
-    # Try PyMuPDF first (faster, no external dependencies)
-    if PYMUPDF_AVAILABLE:
-        return _convert_with_pymupdf(pdf_path, output_dir, dpi, max_pages)
+    cache = page_cache.get_cache()
+    encoding = encoding or DEFAULT_ENCODING
+    pdf_hashes = dict(pdf_hashes or {})
+    page_numbers = page_numbers or {}
     
-    # Fall back to pdf2image (requires poppler)
-    if PDF2IMAGE_AVAILABLE:
-        return _convert_with_pdf2image(pdf_path, output_dir, dpi, max_pages)
+    pages = {}
+    results = {}
+    for pdf_path in pdf_paths:
+        try:
+            pages[pdf_path] = _pages_to_render(pdf_path, max_pages, page_numbers.get(pdf_path))
+            if cache.enabled and not pdf_hashes.get(pdf_path):
+                pdf_hashes[pdf_path] = hash_file(pdf_path)
+        except Exception as e:
+            logger.error(f"Could not open {os.path.basename(pdf_path)}: {str(e)[:100]}")
+            pages[pdf_path] = []
+        results[pdf_path] = [
+            cache.get(pdf_hashes.get(pdf_path), page_num + 1, dpi, encoding.key)
+            for page_num in pages[pdf_path]
+        ]
+    
+    # Pages still to rasterise, as (pdf_path, position, page_num)
+    missing = [
+        (pdf_path, position, page_num)
+        for pdf_path, page_numbers in pages.items()
+        for position, page_num in enumerate(page_numbers)
+        if results[pdf_path][position] is None
+    ]
+    hits = sum(len(p) for p in pages.values()) - len(missing)
+    if hits:
+        logger.debug(f"Page cache: {hits} hit(s), {len(missing)} page(s) to render")
     
-    logger.error("No PDF conversion library available. Install PyMuPDF: pip install PyMuPDF")
-    return []
+    failed = set()
+    rendered = _render_missing_pages(missing, dpi, encoding, failed)
+    for (pdf_path, position, page_num), data in zip(missing, rendered):
+        if data is None:
+            continue
+        results[pdf_path][position] = data
+        cache.put(pdf_hashes.get(pdf_path), page_num + 1, dpi, encoding.key, data)
+    
+    for pdf_path in pdf_paths:
+        if pdf_path in failed or any(data is None for data in results[pdf_path]):
+            results[pdf_path] = []
+            continue
+        if stats is not None:
+            stats[pdf_path] = _trim_stats(pdf_path, pages[pdf_path], results[pdf_path], dpi, encoding)
+        # Blank pages are cached as b'' and dropped here
+        results[pdf_path] = [
+            PageImage(data, page_num + 1)
+            for page_num, data in zip(pages[pdf_path], results[pdf_path])
+            if data
+        ]
+    return results
 
 
-def _convert_with_pymupdf(pdf_path, output_dir, dpi, max_pages):
-    """Convert PDF to images using PyMuPDF (fitz)."""
-    images = []
-    
+def _trim_stats(pdf_path, page_numbers, rendered, dpi, encoding):
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = len(doc)
-        pages_to_convert = min(total_pages, max_pages) if max_pages else total_pages
-        
-        logger.debug(f"Converting {pages_to_convert}/{total_pages} pages from {os.path.basename(pdf_path)}")
-        
-        # Calculate zoom factor from DPI (72 is PDF default)
-        zoom = dpi / 72
-        matrix = fitz.Matrix(zoom, zoom)
-        
-        for page_num in range(pages_to_convert):
-            page = doc[page_num]
-            pix = page.get_pixmap(matrix=matrix)
-            
-            if output_dir:
-                # Save to file
-                os.makedirs(output_dir, exist_ok=True)
-                img_path = os.path.join(output_dir, f"page_{page_num + 1}.png")
-                pix.save(img_path)
-                images.append(img_path)
-            else:
-                # Convert to PIL Image
-                from PIL import Image
-                import io
-                img_data = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_data))
-                images.append(img)
-        
-        doc.close()
-        logger.debug(f"Converted {len(images)} pages to images")
-        return images
-        
+        full_pixels = sum(_page_pixels(pdf_path, page_numbers, dpi, encoding))
+        kept_pixels = sum(_image_pixels(data) for data in rendered)
     except Exception as e:
-        logger.error(f"PyMuPDF conversion failed: {str(e)[:100]}")
-        return []
+        logger.debug(f"Could not compute trim stats for {os.path.basename(pdf_path)}: {str(e)[:100]}")
+        return {}
+    kept_bytes = sum(len(data) for data in rendered)
+    pixels_saved = max(0, full_pixels - kept_pixels)
+    return {
+        'pages': len(rendered),
+        'dropped': sum(1 for data in rendered if not data),
+        'pixels': kept_pixels,
+        'pixels_saved': pixels_saved,
+        'bytes': kept_bytes,
+        'bytes_saved': round(kept_bytes / kept_pixels * pixels_saved) if kept_pixels else 0,
+    }
 
 
-def _convert_with_pdf2image(pdf_path, output_dir, dpi, max_pages):
-    """Convert PDF to images using pdf2image (requires poppler)."""
-    try:
-        kwargs = {'dpi': dpi}
-        if max_pages:
-            kwargs['last_page'] = max_pages
-        
-        images = convert_from_path(pdf_path, **kwargs)
-        
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
-            saved_paths = []
-            for i, img in enumerate(images):
-                img_path = os.path.join(output_dir, f"page_{i + 1}.png")
-                img.save(img_path, 'PNG')
-                saved_paths.append(img_path)
-            logger.debug(f"Converted {len(saved_paths)} pages to images")
-            return saved_paths
-        
-        logger.debug(f"Converted {len(images)} pages to images")
-        return images
-        
-    except Exception as e:
-        logger.error(f"pdf2image conversion failed: {str(e)[:100]}")
-        return []
+def _render_missing_pages(missing, dpi, encoding, failed):
+    """
+    Render (pdf_path, position, page_num) entries, returning bytes (or None) per entry.
+    PDFs that fail to render are added to failed.
+    """
+    pool = _get_render_pool()
+    if pool is not None and missing:
+        try:
+            futures = [pool.submit(_render_pages_worker, pdf_path, [page_num], dpi, encoding) for pdf_path, _, page_num in missing]
+            rendered = []
+            for (pdf_path, _, _), future in zip(missing, futures):
+                try:
+                    rendered.append(future.result()[0])
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    if pdf_path not in failed:
+                        logger.error(f"Rendering failed for {os.path.basename(pdf_path)}: {str(e)[:100]}")
+                    failed.add(pdf_path)
+                    rendered.append(None)
+            logger.debug(f"Rendered {len(missing)} page(s) on the process pool")
+            return rendered
+        except BrokenProcessPool:
+            logger.warning("Rendering pool failed, falling back to in-thread rendering")
+            configure_render_pool(0)
+    
+    # Fallback: render in the calling thread
+    rendered = []
+    for pdf_path, _, page_num in missing:
+        if pdf_path in failed:
+            rendered.append(None)
+            continue
+        try:
+            rendered.append(_render_pages_worker(pdf_path, [page_num], dpi, encoding)[0])
+        except Exception as e:
+            logger.error(f"PyMuPDF rendering failed for {os.path.basename(pdf_path)}: {str(e)[:100]}")
+            failed.add(pdf_path)
+            rendered.append(None)
+    return rendered
 
 
 def get_pdf_page_count(pdf_path):
@@ -136,7 +471,6 @@ def get_pdf_page_count(pdf_path):
     
     if PDF2IMAGE_AVAILABLE:
         try:
-            from pdf2image import pdfinfo_from_path
             info = pdfinfo_from_path(pdf_path)
             return info.get('Pages', 0)
         except:
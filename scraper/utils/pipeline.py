@@ -0,0 +1,130 @@
+"""
+Streaming pipeline for bulletin processing.
+Each stage has its own worker threads and a bounded input queue, so an item
+moves to the next stage as soon as it is ready instead of waiting for the
+whole batch to finish the previous stage.
+"""
+
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # End-of-stream marker passed between stages
+
+
+class Stage:
+    """
+    A pipeline stage.
+    func(item) returns the item to hand to the next stage, or None to drop it.
+    queue_size bounds how many items may wait in front of the stage
+    (default: twice the worker count).
+    summary(stage), if given, returns extra text for the stage's line in the
+    end-of-run statistics (e.g. bytes downloaded).
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=None, summary=None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or self.workers * 2
+        self.summary = summary
+        # Statistics, updated by the stage's workers
+        self.processed = 0
+        self.passed = 0
+        self.busy_time = 0.0
+        self.first_started = None
+        self.last_finished = None
+        self._lock = threading.Lock()
+
+    def _record(self, started, finished, passed):
+        with self._lock:
+            self.processed += 1
+            self.busy_time += finished - started
+            if self.first_started is None or started < self.first_started:
+                self.first_started = started
+            self.last_finished = max(self.last_finished or finished, finished)
+            if passed:
+                self.passed += 1
+
+    @property
+    def active_time(self):
+        """Wall-clock seconds from the stage's first item starting to its last item finishing."""
+        if self.first_started is None:
+            return 0.0
+        return self.last_finished - self.first_started
+
+
+def run_pipeline(items, stages):
+    """
+    Feed items through the stages and yield the output of the last stage
+    as each item completes. Exceptions in a stage are logged and drop the item.
+    """
+    queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+    output = queue.Queue()
+    queues.append(output)
+    start = time.monotonic()
+
+    def feed():
+        for item in items:
+            queues[0].put(item)
+        queues[0].put(_DONE)
+
+    def work(index, stage, remaining):
+        inbox, outbox = queues[index], queues[index + 1]
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                # Let sibling workers see the marker too; the last one out forwards it
+                inbox.put(_DONE)
+                with remaining['lock']:
+                    remaining['count'] -= 1
+                    last = remaining['count'] == 0
+                if last:
+                    outbox.put(_DONE)
+                return
+
+            started = time.monotonic()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                logger.error(f"{stage.name} stage failed: {str(e)[:100]}")
+                result = None
+            stage._record(started, time.monotonic(), result is not None)
+            if result is not None:
+                outbox.put(result)
+
+    threads = [threading.Thread(target=feed, name='pipeline-feed', daemon=True)]
+    for index, stage in enumerate(stages):
+        remaining = {'count': stage.workers, 'lock': threading.Lock()}
+        for n in range(stage.workers):
+            threads.append(threading.Thread(
+                target=work,
+                args=(index, stage, remaining),
+                name=f'pipeline-{stage.name}-{n}',
+                daemon=True
+            ))
+    for thread in threads:
+        thread.start()
+
+    while True:
+        item = output.get()
+        if item is _DONE:
+            break
+        yield item
+
+    elapsed = time.monotonic() - start
+    for stage in stages:
+        extra = ""
+        if stage.summary is not None:
+            try:
+                extra = f"; {stage.summary(stage)}"
+            except Exception as e:
+                logger.debug(f"{stage.name} stage summary failed: {str(e)[:100]}")
+        logger.info(
+            f"Stage {stage.name:<9} {stage.passed}/{stage.processed} passed, "
+            f"{stage.busy_time:.1f}s busy across {stage.workers} worker(s){extra}"
+        )
+    logger.info(f"Pipeline finished in {elapsed:.1f}s")
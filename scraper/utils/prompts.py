@@ -0,0 +1,151 @@
+"""
+Prompt building helpers shared by the LLM utilities.
+Church records are pruned to the fields each mode actually compares and
+serialised compactly (no indentation or spaces). Rendered fields are cached
+per church, so a schedule serialised for the Mass comparison is reused by
+the intentions prompt and the update pass. Estimated prompt tokens, and the
+tokens saved against the context each mode sent before, are tracked per
+mode and logged at the end of a run.
+"""
+
+import json
+import threading
+import logging
+from collections import defaultdict
+
+from . import events, intentions
+from .llm_engine import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Church fields sent to the LLM per mode; everything else (address, map,
+# coordinates, phone, offices, ...) is irrelevant to the comparison
+SCHEDULE_FIELDS = ('masses', 'daily_masses', 'confession', 'adoration')
+MODE_FIELDS = {
+    'mass': ('id', 'name') + SCHEDULE_FIELDS,
+    'events': ('id', 'name', 'familyOfParishes'),
+    'intentions': ('id', 'name', 'masses', 'daily_masses'),
+    'update': SCHEDULE_FIELDS,
+}
+
+_lock = threading.Lock()
+# (church id, field) -> (source record, rendered '"field":value' fragment);
+# field ('previous', mode) holds the length of the church in that mode's old context
+_fragment_cache = {}
+# mode -> [requests, estimated prompt tokens, estimated tokens saved]
+_stats = defaultdict(lambda: [0, 0, 0])
+
+
+def compact_json(data):
+    """Serialise data without indentation or spaces after separators."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def prune(church, mode):
+    """Copy of a church record with only the fields the mode needs (missing fields are omitted)."""
+    return {field: church[field] for field in MODE_FIELDS[mode] if field in church}
+
+
+def church_context(church, mode):
+    """
+    Compact, pruned JSON for one church.
+    Each field is rendered once per church and shared by every mode that
+    sends it. Cache entries are only reused for the very same record object,
+    so a patched or reloaded church is always rendered afresh.
+
+    Returns:
+        (text, chars saved compared with the church in the mode's old context)
+    """
+    fragments = [_fragment(church, field) for field in MODE_FIELDS[mode] if field in church]
+    text = '{' + ','.join(fragments) + '}'
+    return text, _fragment(church, ('previous', mode)) - len(text)
+
+
+def _fragment(church, field):
+    key = (church.get('id'), field)
+    with _lock:
+        cached = _fragment_cache.get(key)
+    if cached is not None and cached[0] is church:
+        return cached[1]
+    if isinstance(field, tuple):
+        rendered = _previous_length(church, field[1])
+    else:
+        rendered = compact_json({field: church[field]})[1:-1]
+    with _lock:
+        _fragment_cache[key] = (church, rendered)
+    return rendered
+
+
+def _previous_length(church, mode):
+    """
+    Length of a church as each mode serialised it before compact context:
+    an item of an indented list (the full record for mass, the simplified
+    records of events and intentions), or the compact schedule dict of the
+    update pass.
+    """
+    if mode == 'update':
+        return len(json.dumps({field: church.get(field, []) for field in SCHEDULE_FIELDS}, ensure_ascii=False))
+    if mode == 'events':
+        church = events.prepare_churches_context([church])[0]
+    elif mode == 'intentions':
+        church = intentions.prepare_churches_context([church])[0]
+    # json.dumps([church], indent=2) minus the enclosing "[\n" and "\n]"
+    return len(json.dumps([church], indent=2)) - 4
+
+
+def churches_context(churches, mode):
+    """
+    Compact JSON array of the churches' mode fields.
+
+    Returns:
+        (text, chars saved compared with the mode's old indented list)
+    """
+    parts = [church_context(church, mode) for church in churches]
+    text = '[' + ','.join(part for part, _ in parts) + ']'
+    saved = sum(saved for _, saved in parts)
+    if churches:
+        # The indented list also had ",\n" rather than "," between records and a newline inside each bracket
+        saved += len(churches) + 1
+    return text, saved
+
+
+def records_context(records):
+    """
+    Compact JSON for other prompt data (e.g. existing events).
+
+    Returns:
+        (text, chars saved compared with json.dumps(records, indent=2))
+    """
+    text = compact_json(records)
+    return text, len(json.dumps(records, indent=2)) - len(text)
+
+
+def account(mode, payload, saved_chars, context=""):
+    """
+    Record a request's estimated prompt tokens and the tokens saved by
+    compact, pruned context, and log them at DEBUG level.
+
+    Returns:
+        Estimated prompt tokens (text, images and attached files; output budget excluded)
+    """
+    tokens = estimate_tokens(dict(payload, max_tokens=None, reasoning=None))
+    saved = max(0, saved_chars) // CHARS_PER_TOKEN
+    with _lock:
+        stats = _stats[mode]
+        stats[0] += 1
+        stats[1] += tokens
+        stats[2] += saved
+    logger.debug(f"Prompt for {context or mode}: ~{tokens} tokens (~{saved} saved by compact context)")
+    return tokens
+
+
+def log_stats():
+    """Log estimated prompt tokens and savings per mode for the run."""
+    with _lock:
+        stats = {mode: list(values) for mode, values in _stats.items()}
+    for mode, (requests, tokens, saved) in stats.items():
+        if requests:
+            logger.info(
+                f"Prompts ({mode}): {requests} built, ~{tokens} tokens in total "
+                f"(~{tokens // requests} per request), ~{saved} saved by compact context"
+            )
@@ -0,0 +1,204 @@
+"""
+Output schemas for the LLM extractors.
+The pydantic models below are sent to OpenRouter as JSON-schema structured
+output, and the same models validate whatever comes back. Responses are read
+element by element, so a truncated or slightly malformed answer still yields
+every complete, valid item instead of failing the whole call.
+"""
+
+import copy
+import json
+import re
+import logging
+from typing import List, Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class _Item(BaseModel):
+    # Unknown keys are kept, and numbers are accepted where text is expected
+    # (models sometimes answer 1730 instead of "1730")
+    model_config = ConfigDict(extra='allow', coerce_numbers_to_str=True, populate_by_name=True)
+
+
+class Event(_Item):
+    id: Optional[str] = None
+    title: str
+    description: Optional[str] = None
+    church_id: Optional[str] = None
+    church_name: Optional[str] = None
+    family_of_parishes: Optional[str] = None
+    date: str
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    location: Optional[str] = None
+    tags: List[str] = []
+
+
+class EventMatch(_Item):
+    """Existing event id (or null) for one extracted event, by its index in the request."""
+    index: int
+    id: Optional[str] = None
+
+
+class Intention(_Item):
+    for_: str = Field(alias='for')
+    by: Optional[str] = None
+
+
+class MassIntentions(_Item):
+    church_id: Optional[str] = None
+    date: str
+    time: Optional[str] = None
+    intentions: List[Intention] = []
+
+
+class Difference(_Item):
+    """One schedule difference between a bulletin and churches.json."""
+    church_id: str
+    field: str
+    bulletin: Optional[str] = None
+    database: Optional[str] = None
+    page: Optional[str] = None
+    note: Optional[str] = None
+
+
+class ScheduleEntry(_Item):
+    day: str
+    time: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+
+class PatchOperation(_Item):
+    """JSON-Patch style change to one church record (see church_patches.apply_patch)."""
+    op: Literal['add', 'remove', 'replace']
+    path: str
+    value: Optional[Union[ScheduleEntry, str]] = None
+
+
+# Top-level key wrapping each array (structured output requires an object at the root)
+DIFFERENCES = ('differences', Difference)
+EVENTS = ('events', Event)
+MATCHES = ('matches', EventMatch)
+INTENTIONS = ('intentions', MassIntentions)
+PATCHES = ('operations', PatchOperation)
+
+_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+# Start of an array of objects (or an empty array), skipping stray brackets in prose
+_ARRAY_START = re.compile(r'\[\s*[{\]]')
+
+
+def response_format(kind):
+    """
+    OpenRouter response_format requesting {"<key>": [<item>, ...]} for a kind
+    (DIFFERENCES, EVENTS, MATCHES, INTENTIONS or PATCHES).
+    """
+    key, model = kind
+    item_schema = _clean_schema(model.model_json_schema(by_alias=True))
+    return {
+        'type': 'json_schema',
+        'json_schema': {
+            'name': key,
+            'strict': True,
+            'schema': {
+                'type': 'object',
+                'properties': {key: {'type': 'array', 'items': item_schema}},
+                'required': [key],
+                'additionalProperties': False,
+            },
+        },
+    }
+
+
+def _clean_schema(schema):
+    """Inline $defs, drop keywords providers reject, and require every property (strict mode)."""
+    defs = schema.pop('$defs', {})
+
+    def clean(node):
+        if isinstance(node, list):
+            return [clean(n) for n in node]
+        if not isinstance(node, dict):
+            return node
+        if '$ref' in node:
+            return clean(copy.deepcopy(defs[node['$ref'].split('/')[-1]]))
+        node = {k: clean(v) for k, v in node.items() if k not in ('title', 'default', 'description')}
+        if node.get('type') == 'object' and 'properties' in node:
+            node['required'] = list(node['properties'])
+            node['additionalProperties'] = False
+        return node
+
+    return clean(schema)
+
+
+def parse_items(content, kind):
+    """
+    Parse and validate the items of an LLM JSON answer.
+    Accepts the structured {"<key>": [...]} object or a bare array, with or
+    without a code fence or surrounding prose. Elements are decoded one at a
+    time, so a response cut off mid-array keeps every element before the cut;
+    elements that fail validation are dropped.
+
+    Args:
+        content: Response text
+        kind: DIFFERENCES, EVENTS, MATCHES, INTENTIONS or PATCHES
+
+    Returns:
+        (items, complete): list of validated dicts (None if no array was found)
+        and whether the whole array was read and every element was valid
+    """
+    key, model = kind
+    raw, complete = _decode_array(_FENCE.sub('', content.strip()), key)
+    if raw is None:
+        return None, False
+
+    items = []
+    for element in raw:
+        try:
+            items.append(model.model_validate(element).model_dump(by_alias=True))
+        except ValidationError as e:
+            complete = False
+            logger.debug(f"Dropped invalid {key} item: {str(e).splitlines()[0]} ({str(element)[:80]})")
+    return items, complete
+
+
+def _decode_array(text, key):
+    """Return (elements, complete) for the first array of objects in text, or (None, False)."""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        pass
+    else:
+        if isinstance(data, dict):
+            data = data.get(key, next((v for v in data.values() if isinstance(v, list)), None))
+        if isinstance(data, list):
+            return data, True
+
+    # Incremental fallback: decode element by element from the start of the array
+    match = _ARRAY_START.search(text)
+    if not match:
+        return None, False
+    decoder = json.JSONDecoder()
+    elements = []
+    pos = match.start() + 1
+    while True:
+        pos = _skip(text, pos, ' \t\r\n,')
+        if pos >= len(text):
+            logger.debug(f"Response ended mid-array; salvaged {len(elements)} {key} item(s)")
+            return elements, False
+        if text[pos] == ']':
+            return elements, True
+        try:
+            element, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            logger.debug(f"Unreadable JSON after {len(elements)} {key} item(s); keeping those")
+            return elements, False
+        elements.append(element)
+
+
+def _skip(text, pos, chars):
+    while pos < len(text) and text[pos] in chars:
+        pos += 1
+    return pos
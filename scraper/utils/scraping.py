@@ -6,17 +6,85 @@ import json
 import os
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-import cloudscraper
+from contextlib import contextmanager
 import requests
+import threading
 import time
 import logging
 
+from . import sessions, http_cache
+
 logger = logging.getLogger(__name__)
 
 PREFERRED_DOMAINS = ['parishbulletins.com', 'files.ecatholic.com']
 MAX_RETRIES = 10
 RETRY_DELAYS = [1, 2, 4, 8, 16, 16, 16, 16, 16, 16]  # Exponential backoff in seconds
 
+# Discovery concurrency and per-host politeness
+DISCOVERY_WORKERS = 8
+HOST_MIN_INTERVAL = 1.0  # Minimum seconds between request starts to the same host
+HOST_MAX_IN_FLIGHT = 1   # Maximum concurrent requests to the same host
+
+# PDF download configuration
+MAX_PDF_BYTES = 50 * 1024 * 1024  # Refuse bulletins larger than this
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_RETRIES = 3               # Attempts per PDF, resuming with Range where possible
+DOWNLOAD_TIMEOUT = (10, 30)        # (connect, read-idle) seconds
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_HOST_MAX_IN_FLIGHT = 2    # Concurrent downloads from the same host
+DOWNLOAD_HOST_MIN_INTERVAL = 0.5   # Seconds between download starts on the same host
+
+
+class DownloadTooLarge(Exception):
+    """Raised when a PDF exceeds the configured maximum size."""
+
+
+class HostThrottle:
+    """
+    Per-host politeness scheduler.
+    Limits how many requests may be in flight to a single host and enforces a
+    minimum interval between request starts to that host. Requests to different
+    hosts never wait on each other.
+    """
+
+    def __init__(self, min_interval=HOST_MIN_INTERVAL, max_in_flight=HOST_MAX_IN_FLIGHT):
+        self.min_interval = min_interval
+        self.max_in_flight = max(1, max_in_flight)
+        self._lock = threading.Lock()
+        self._hosts = {}  # host -> {'semaphore', 'next_start'}
+
+    def _host_state(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = {
+                    'semaphore': threading.BoundedSemaphore(self.max_in_flight),
+                    'next_start': 0.0,
+                }
+                self._hosts[host] = state
+            return state
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Context manager that blocks until a request to the URL's host is allowed.
+        """
+        state = self._host_state(sessions.get_host(url))
+        state['semaphore'].acquire()
+        try:
+            # Reserve the next start time for this host while holding the lock,
+            # then sleep outside of it so other hosts are not held up
+            with self._lock:
+                now = time.monotonic()
+                start_at = max(now, state['next_start'])
+                state['next_start'] = start_at + self.min_interval
+            wait = start_at - now
+            if wait > 0:
+                time.sleep(wait)
+            yield
+        finally:
+            state['semaphore'].release()
+
 
 def load_churches_json(churches_path):
     """Load churches data from JSON file"""
@@ -25,17 +93,13 @@ def load_churches_json(churches_path):
         return json.load(f)
 
 
-def get_bulletin_links(churches):
+def get_bulletin_websites(churches):
     """
-    Scrape all bulletin websites and extract PDF links.
-    Returns a dict mapping bulletin_website -> pdf_link
+    Collect the distinct bulletin websites to scrape.
+    Returns a dict mapping bulletin_website -> first church name using it,
+    in churches.json order.
     """
-    logger.info(f"Scraping bulletin links for {len(churches)} churches")
-    
-    website_cache = {}
-    scraped_count = 0
-    failed_count = 0
-    
+    websites = {}
     for church in churches:
         church_name = church.get('name', 'Unknown')
         bulletin_website = church.get('bulletin_website', '')
@@ -45,38 +109,30 @@ def get_bulletin_links(churches):
             logger.debug(f"Skipping {church_name}: No bulletin website")
             continue
         
-        # Skip if already scraped this website
-        if bulletin_website in website_cache:
+        # Skip if already queued this website
+        if bulletin_website in websites:
             logger.debug(f"Using cached result for {bulletin_website}")
             continue
         
-        # Try to scrape with retries
-        pdf_link = scrape_bulletin_with_retry(church_name, bulletin_website)
-        
-        if pdf_link:
-            website_cache[bulletin_website] = pdf_link
-            scraped_count += 1
-            logger.info(f"✓ {church_name}: {pdf_link[:60]}...")
-        else:
-            website_cache[bulletin_website] = None
-            failed_count += 1
-            logger.warning(f"✗ {church_name}: No PDF found after retries")
-        
-        # Add delay between requests to reduce 403 errors and rate limiting
-        time.sleep(1)
+        websites[bulletin_website] = church_name
     
-    logger.info(f"Scraping complete: {scraped_count} found, {failed_count} failed")
-    return website_cache
+    return websites
 
 
-def scrape_bulletin_with_retry(church_name, bulletin_website):
+def scrape_bulletin_with_retry(church_name, bulletin_website, throttle=None):
     """
     Scrape a bulletin website with retry logic.
+    The host slot is only held while a request is in flight, so retry
+    back-off does not block other requests to the same host.
     Returns PDF link or None if all retries fail.
     """
     for attempt in range(MAX_RETRIES):
         try:
-            pdf_link = scrape_bulletin(bulletin_website)
+            if throttle:
+                with throttle.slot(bulletin_website):
+                    pdf_link = scrape_bulletin(bulletin_website)
+            else:
+                pdf_link = scrape_bulletin(bulletin_website)
             if pdf_link:
                 return pdf_link
             
@@ -102,29 +158,38 @@ def scrape_bulletin_with_retry(church_name, bulletin_website):
 def scrape_bulletin(bulletin_website):
     """
     Scrape a single bulletin website and extract PDF link.
-    Uses cloudscraper to bypass Cloudflare.
+    Uses a pooled cloudscraper session per host to bypass Cloudflare while
+    reusing connections and clearance cookies.
     Returns the preferred PDF link or None.
     """
-    # Create scraper with explicit browser headers to mimic legitimate traffic
-    scraper = cloudscraper.create_scraper()
-    
-    # Add custom headers to further reduce 403 errors
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate',
-        'Referer': 'https://www.google.com/',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1'
-    }
+    scraper = sessions.get_session(bulletin_website)
+    cache = http_cache.get_cache()
     
-    response = scraper.get(bulletin_website, headers=headers, timeout=15)
+    response = scraper.get(
+        bulletin_website,
+        headers=cache.conditional_headers(bulletin_website),
+        timeout=15
+    )
+    if response.status_code == 403:
+        # Clearance was rejected; start the next attempt with a fresh session
+        sessions.invalidate_session(bulletin_website)
     response.raise_for_status()
     
+    html = None
+    if response.status_code == 304:
+        html = cache.load_text(bulletin_website)
+        if html is not None:
+            logger.debug(f"Not modified, using cached page: {bulletin_website}")
+    if html is None:
+        if response.status_code == 304:
+            # Cache entry vanished between request and read; fetch unconditionally
+            response = scraper.get(bulletin_website, timeout=15)
+            response.raise_for_status()
+        html = response.text
+        cache.store(bulletin_website, response, response.content)
+    
     # Parse HTML
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(html, 'html.parser')
     
     # Find all PDF links
     preferred_pdfs = []
@@ -147,45 +212,126 @@ def scrape_bulletin(bulletin_website):
     return all_pdfs[0] if all_pdfs else None
 
 
-def download_pdf(pdf_url, output_path):
+def download_pdf(pdf_url, output_path, max_bytes=MAX_PDF_BYTES):
     """
     Download a PDF from a URL and save to disk.
+    The body is streamed in chunks to a temporary .part file and atomically
+    renamed into place, so output_path never holds a partial download.
+    Interrupted transfers are resumed with a Range request when the server
+    supports it. Sends conditional headers and reuses the cached copy when
+    the server answers 304 Not Modified.
     Returns True if successful, False otherwise.
     """
+    cache = http_cache.get_cache()
+    part_path = f'{output_path}.part'
+    received = 0
+    validator = None  # ETag/Last-Modified of the response being resumed
+    cache_response = None
+    
+    # Never resume a leftover .part from an earlier run: its source is unknown
+    _remove_file(part_path)
+    
     try:
         logger.debug(f"Downloading {pdf_url[:60]}...")
-        response = requests.get(pdf_url, timeout=20)
-        response.raise_for_status()
-        
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+        for attempt in range(DOWNLOAD_RETRIES):
+            if received and validator:
+                headers = {'Range': f'bytes={received}-', 'If-Range': validator}
+            elif attempt == 0:
+                headers = cache.conditional_headers(pdf_url)
+            else:
+                headers = {}
+            
+            try:
+                with requests.get(pdf_url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                    response.raise_for_status()
+                    
+                    if response.status_code == 304:
+                        if cache.restore_to(pdf_url, output_path):
+                            logger.debug(f"Not modified, reused cached copy for {output_path}")
+                            return True
+                        continue
+                    
+                    if response.status_code == 206:
+                        mode = 'ab'
+                        logger.debug(f"Resuming {pdf_url[:60]}... at byte {received}")
+                    else:
+                        # Full body (first attempt, or server ignored/refused the range)
+                        mode = 'wb'
+                        received = 0
+                        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+                        cache_response = response
+                    
+                    expected = _expected_total(response, received)
+                    if expected is not None and expected > max_bytes:
+                        raise DownloadTooLarge(f"{expected} bytes exceeds limit of {max_bytes}")
+                    
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            if not chunk:
+                                continue
+                            received += len(chunk)
+                            if received > max_bytes:
+                                raise DownloadTooLarge(f"more than {max_bytes} bytes received")
+                            f.write(chunk)
+                    
+                    if expected is not None and received < expected:
+                        raise requests.exceptions.ChunkedEncodingError(
+                            f"connection closed at {received}/{expected} bytes"
+                        )
+                
+                if not _looks_like_pdf(part_path):
+                    logger.error(f"Not a PDF, discarding {pdf_url[:60]}...")
+                    _remove_file(part_path)
+                    return False
+                
+                os.replace(part_path, output_path)
+                if cache_response is not None:
+                    cache.store_file(pdf_url, cache_response, output_path)
+                logger.debug(f"Saved {received} bytes to {output_path}")
+                return True
+            
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout) as e:
+                if attempt < DOWNLOAD_RETRIES - 1:
+                    logger.warning(
+                        f"Download interrupted for {pdf_url[:60]}... at {received} bytes "
+                        f"(attempt {attempt + 1}/{DOWNLOAD_RETRIES}): {str(e)[:50]}"
+                    )
+                    continue
+                raise
         
-        logger.debug(f"Saved to {output_path}")
-        return True
+        logger.error(f"Failed to download {pdf_url[:60]}... after {DOWNLOAD_RETRIES} attempts")
+        _remove_file(part_path)
+        return False
     
     except Exception as e:
         logger.error(f"Failed to download {pdf_url[:60]}...: {str(e)[:50]}")
+        _remove_file(part_path)
         return False
 
 
-def download_all_pdfs(website_cache, output_dir):
-    """
-    Download all PDFs from the website cache.
-    Returns a list of (website, pdf_link, pdf_path) tuples for successful downloads.
-    """
-    logger.info("Downloading bulletins...")
-    
-    os.makedirs(output_dir, exist_ok=True)
-    downloaded = []
-    
-    for idx, (website, pdf_link) in enumerate(website_cache.items(), 1):
-        if not pdf_link:
-            logger.debug(f"Skipping {website}: No PDF link")
-            continue
-        
-        output_path = os.path.join(output_dir, f'bulletin_{idx}.pdf')
-        if download_pdf(pdf_link, output_path):
-            downloaded.append((website, pdf_link, output_path))
-    
-    logger.info(f"Downloaded {len(downloaded)} bulletins")
-    return downloaded
\ No newline at end of file
+def _expected_total(response, received):
+    """Total body size implied by Content-Length (offset by resumed bytes for 206), or None."""
+    length = response.headers.get('Content-Length')
+    if not length or not length.isdigit():
+        return None
+    if response.status_code == 206:
+        return received + int(length)
+    return int(length)
+
+
+def _looks_like_pdf(path):
+    """PDF files must contain the %PDF header within the first 1024 bytes."""
+    try:
+        with open(path, 'rb') as f:
+            return b'%PDF' in f.read(1024)
+    except OSError:
+        return False
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,192 @@
+"""
+Pooled HTTP sessions for scraping bulletin websites.
+Keeps one cloudscraper session per host so connections and Cloudflare
+clearance are reused, and persists cookies to a local jar between runs.
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from pathlib import Path
+from urllib.parse import urlparse
+
+import cloudscraper
+
+logger = logging.getLogger(__name__)
+
+COOKIE_JAR_PATH = Path(__file__).resolve().parent.parent / '.cache' / 'cookies.json'
+SESSION_MAX_AGE = 30 * 60              # Recreate a host's session after this many seconds
+SESSION_COOKIE_TTL = 12 * 60 * 60      # Keep cookies without an expiry for this long
+
+# Explicit browser headers to mimic legitimate traffic and reduce 403 errors.
+# The User-Agent must stay stable because Cloudflare ties clearance cookies to it.
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Referer': 'https://www.google.com/',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+
+def get_host(url):
+    """Return the lowercased host (netloc) of a URL, used to key sessions and politeness limits."""
+    return urlparse(url).netloc.lower()
+
+
+class SessionPool:
+    """
+    Pool of cloudscraper sessions keyed by host.
+    Sessions are created lazily, seeded with any unexpired cookies from the
+    cookie jar, and recycled after SESSION_MAX_AGE seconds.
+    """
+
+    def __init__(self, cookie_jar_path=COOKIE_JAR_PATH, max_age=SESSION_MAX_AGE):
+        self.cookie_jar_path = Path(cookie_jar_path)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._sessions = {}  # host -> (session, created_at)
+        self._stored_cookies = None  # host -> list of cookie dicts, loaded lazily
+
+    def get(self, url):
+        """Return the pooled session for the URL's host, creating it if needed."""
+        host = get_host(url)
+        with self._lock:
+            entry = self._sessions.get(host)
+            if entry and time.time() - entry[1] < self.max_age:
+                return entry[0]
+            if entry:
+                logger.debug(f"Recycling expired session for {host}")
+                self._stash_cookies(host, entry[0])
+                entry[0].close()
+
+            session = cloudscraper.create_scraper()
+            session.headers.update(BROWSER_HEADERS)
+            restored = self._restore_cookies(host, session)
+            if restored:
+                logger.debug(f"Restored {restored} cookie(s) for {host}")
+            self._sessions[host] = (session, time.time())
+            return session
+
+    def invalidate(self, url):
+        """
+        Drop the session and stored cookies for the URL's host.
+        Used after a 403 so the next attempt re-does the challenge from scratch.
+        """
+        host = get_host(url)
+        with self._lock:
+            entry = self._sessions.pop(host, None)
+            if entry:
+                entry[0].close()
+            if self._stored_cookies is not None:
+                self._stored_cookies.pop(host, None)
+        logger.debug(f"Invalidated session for {host}")
+
+    def save_cookies(self):
+        """Persist unexpired cookies from all pooled sessions to the cookie jar."""
+        with self._lock:
+            for host, (session, _) in self._sessions.items():
+                self._stash_cookies(host, session)
+            stored = self._load_stored_cookies()
+            now = time.time()
+            jar = {
+                host: [c for c in cookies if not _is_expired(c, now)]
+                for host, cookies in stored.items()
+            }
+            jar = {host: cookies for host, cookies in jar.items() if cookies}
+
+        try:
+            os.makedirs(self.cookie_jar_path.parent, exist_ok=True)
+            tmp_path = self.cookie_jar_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(jar, f, indent=2)
+            os.replace(tmp_path, self.cookie_jar_path)
+            logger.debug(f"Saved cookies for {len(jar)} host(s) to {self.cookie_jar_path}")
+        except OSError as e:
+            logger.warning(f"Failed to save cookie jar: {str(e)[:100]}")
+
+    def close(self):
+        """Close all pooled sessions."""
+        with self._lock:
+            for session, _ in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def _load_stored_cookies(self):
+        # Caller must hold self._lock
+        if self._stored_cookies is None:
+            try:
+                with open(self.cookie_jar_path, 'r', encoding='utf-8') as f:
+                    self._stored_cookies = json.load(f)
+            except FileNotFoundError:
+                self._stored_cookies = {}
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable cookie jar: {str(e)[:100]}")
+                self._stored_cookies = {}
+        return self._stored_cookies
+
+    def _restore_cookies(self, host, session):
+        # Caller must hold self._lock
+        now = time.time()
+        restored = 0
+        for cookie in self._load_stored_cookies().get(host, []):
+            if _is_expired(cookie, now):
+                continue
+            session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain', ''),
+                path=cookie.get('path', '/'),
+                expires=cookie.get('expires'),
+                secure=cookie.get('secure', False)
+            )
+            restored += 1
+        return restored
+
+    def _stash_cookies(self, host, session):
+        # Caller must hold self._lock
+        now = time.time()
+        self._load_stored_cookies()[host] = [
+            {
+                'name': c.name,
+                'value': c.value,
+                'domain': c.domain,
+                'path': c.path,
+                'expires': c.expires,
+                'secure': bool(c.secure),
+                'saved_at': now,
+            }
+            for c in session.cookies
+        ]
+
+
+def _is_expired(cookie, now):
+    """Check a stored cookie dict against its expiry (or the session-cookie TTL)."""
+    expires = cookie.get('expires')
+    if expires:
+        return expires <= now
+    return now - cookie.get('saved_at', 0) > SESSION_COOKIE_TTL
+
+
+# Shared pool used by the scraping utilities
+_default_pool = SessionPool()
+
+
+def get_session(url):
+    """Return the shared pooled session for the URL's host."""
+    return _default_pool.get(url)
+
+
+def invalidate_session(url):
+    """Drop the shared pooled session (and its cookies) for the URL's host."""
+    _default_pool.invalidate(url)
+
+
+def save_cookies():
+    """Persist cookies from the shared pool to the local cookie jar."""
+    _default_pool.save_cookies()